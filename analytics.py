@@ -0,0 +1,233 @@
+import threading
+
+import numpy as np
+
+from market_data import session_day
+
+
+class Portfolio:
+    # Open positions as parallel arrays (one row per position) with the latest price per symbol
+    # kept separately, so every price update is one vectorized pass over all rows.
+    def __init__(self, capacity=64, target_pct=1.0):
+        self.target_pct = target_pct
+        self.keys = []
+        self.rows = {}
+        self.symbols = []
+        self.symbol_ids = {}
+        self.prices = np.full(16, np.nan)
+
+        self.size = 0
+        self.symbol_of = np.empty(capacity, dtype=np.int64)
+        self.shares = np.empty(capacity)
+        self.entry = np.empty(capacity)
+        # Preallocated outputs, refreshed in place by recompute()
+        self.price = np.empty(capacity)
+        self.value = np.empty(capacity)
+        self.unrealized = np.empty(capacity)
+        self.to_target_pct = np.empty(capacity)
+
+        self.exposure = 0.0
+        self.cost = 0.0
+        self.total_unrealized = 0.0
+        self.nearest_target_pct = np.nan
+
+    def __len__(self):
+        return self.size
+
+    def _symbol_id(self, symbol):
+        symbol_id = self.symbol_ids.get(symbol)
+        if symbol_id is None:
+            symbol_id = len(self.symbols)
+            self.symbol_ids[symbol] = symbol_id
+            self.symbols.append(symbol)
+            if symbol_id == len(self.prices):
+                self.prices = np.concatenate([self.prices, np.full(len(self.prices), np.nan)])
+        return symbol_id
+
+    def _grow(self):
+        capacity = len(self.shares) * 2
+        for name in ("symbol_of", "shares", "entry", "price", "value", "unrealized", "to_target_pct"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def open(self, key, symbol, entry_price, dollars=None, shares=None):
+        # Buys are placed in dollars, so the share count is derived from the entry price
+        self.close(key)
+        if shares is None:
+            shares = dollars / entry_price
+        if self.size == len(self.shares):
+            self._grow()
+        row = self.size
+        self.keys.append(key)
+        self.rows[key] = row
+        self.symbol_of[row] = self._symbol_id(symbol)
+        self.shares[row] = shares
+        self.entry[row] = entry_price
+        self.size += 1
+        self.recompute()
+
+    def close(self, key):
+        row = self.rows.pop(key, None)
+        if row is None:
+            return
+        # Swap the last row into the gap so the arrays stay dense
+        last = self.size - 1
+        if row != last:
+            for name in ("symbol_of", "shares", "entry"):
+                array = getattr(self, name)
+                array[row] = array[last]
+            self.keys[row] = self.keys[last]
+            self.rows[self.keys[row]] = row
+        self.keys.pop()
+        self.size -= 1
+        self.recompute()
+
+    def update_price(self, symbol, price):
+        self.prices[self._symbol_id(symbol)] = price
+        self.recompute()
+
+    def recompute(self):
+        n = self.size
+        if n == 0:
+            self.exposure = self.cost = self.total_unrealized = 0.0
+            self.nearest_target_pct = np.nan
+            return
+
+        price = self.price[:n]
+        np.take(self.prices, self.symbol_of[:n], out=price)
+        # Positions without a quote yet are marked at their entry price
+        np.copyto(price, self.entry[:n], where=np.isnan(price))
+
+        value = self.value[:n]
+        np.multiply(price, self.shares[:n], out=value)
+        unrealized = self.unrealized[:n]
+        np.subtract(price, self.entry[:n], out=unrealized)
+        unrealized *= self.shares[:n]
+
+        to_target = self.to_target_pct[:n]
+        np.multiply(self.entry[:n], 1 + self.target_pct / 100, out=to_target)
+        to_target /= price
+        to_target -= 1
+        to_target *= 100
+
+        self.exposure = float(value.sum())
+        self.total_unrealized = float(unrealized.sum())
+        self.cost = self.exposure - self.total_unrealized
+        # Closest position to its target on either side; negative means it has already passed it
+        self.nearest_target_pct = float(to_target[np.abs(to_target).argmin()])
+
+    def summary_text(self):
+        if self.size == 0:
+            return "No open positions."
+        pct = self.total_unrealized / self.cost * 100 if self.cost else 0.0
+        return (f"Positions: {self.size} | Exposure: ${self.exposure:,.2f} | "
+                f"Unrealized: ${self.total_unrealized:+,.2f} ({pct:+.2f}%) | "
+                f"Nearest target: {self.nearest_target_pct:+.2f}%")
+
+
+class RelativeStrength:
+    # Rolling beta, correlation and excess return of each symbol against one benchmark. Paired
+    # 1-minute returns go into a per-symbol ring of `window` slots and running sums are adjusted
+    # as pairs enter and leave, so each new bar costs O(1) no matter how long the window is.
+    def __init__(self, window=60, capacity=16):
+        self.window = window
+        self.rows = {}
+        self.ring_x = np.zeros((capacity, window))
+        self.ring_y = np.zeros((capacity, window))
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.pos = np.zeros(capacity, dtype=np.int64)
+        self.last_ts = np.zeros(capacity, dtype=np.int64)
+        self.sums = np.zeros((5, capacity))  # sum x, sum y, sum xx, sum yy, sum xy
+        # Reading last_ts, pushing and advancing it must happen as one step, or a pair can be counted twice
+        self.lock = threading.Lock()
+
+    def reset(self):
+        with self.lock:
+            self.count[:] = 0
+            self.pos[:] = 0
+            self.last_ts[:] = 0
+            self.sums[:] = 0
+
+    def _row(self, symbol):
+        row = self.rows.get(symbol)
+        if row is None:
+            row = len(self.rows)
+            self.rows[symbol] = row
+            if row == len(self.count):
+                grow = len(self.count)
+                self.ring_x = np.concatenate([self.ring_x, np.zeros_like(self.ring_x)])
+                self.ring_y = np.concatenate([self.ring_y, np.zeros_like(self.ring_y)])
+                self.count = np.concatenate([self.count, np.zeros(grow, dtype=np.int64)])
+                self.pos = np.concatenate([self.pos, np.zeros(grow, dtype=np.int64)])
+                self.last_ts = np.concatenate([self.last_ts, np.zeros(grow, dtype=np.int64)])
+                self.sums = np.concatenate([self.sums, np.zeros_like(self.sums)], axis=1)
+        return row
+
+    def push(self, row, x, y):
+        sums = self.sums
+        p = self.pos[row]
+        if self.count[row] == self.window:
+            ox = self.ring_x[row, p]
+            oy = self.ring_y[row, p]
+            sums[0, row] -= ox
+            sums[1, row] -= oy
+            sums[2, row] -= ox * ox
+            sums[3, row] -= oy * oy
+            sums[4, row] -= ox * oy
+        else:
+            self.count[row] += 1
+        self.ring_x[row, p] = x
+        self.ring_y[row, p] = y
+        sums[0, row] += x
+        sums[1, row] += y
+        sums[2, row] += x * x
+        sums[3, row] += y * y
+        sums[4, row] += x * y
+        self.pos[row] = (p + 1) % self.window
+
+    def update(self, symbol, bars, benchmark):
+        with self.lock:
+            self._consume(symbol, bars, benchmark)
+
+    def _consume(self, symbol, bars, benchmark):
+        # Consume the completed bars (all but the still-forming last one) not seen yet for this symbol
+        row = self._row(symbol)
+        if bars.size < 3 or benchmark.size < 3:
+            return
+        bench_ts = benchmark.ts[:benchmark.size - 1]
+        ts = bars.ts
+        cutoff = min(ts[bars.size - 2], bench_ts[-1])
+        start = max(int(np.searchsorted(ts[:bars.size], self.last_ts[row], side="right")), 1)
+
+        for i in range(start, bars.size - 1):
+            t = ts[i]
+            if t > cutoff:
+                break
+            self.last_ts[row] = t
+            if session_day(t) != session_day(ts[i - 1]):
+                continue
+            j = np.searchsorted(bench_ts, t)
+            if j == 0 or j >= len(bench_ts) or bench_ts[j] != t or bench_ts[j - 1] != ts[i - 1]:
+                continue
+            y = bars.close[i] / bars.close[i - 1] - 1
+            x = benchmark.close[j] / benchmark.close[j - 1] - 1
+            self.push(row, x, y)
+
+    def stats(self, symbol):
+        # beta, correlation and excess return (%) over the window, or None until there are enough pairs
+        with self.lock:
+            row = self.rows.get(symbol)
+            if row is None or self.count[row] < 10:
+                return None
+            n = self.count[row]
+            sx, sy, sxx, syy, sxy = self.sums[:, row]
+        var_x = sxx / n - (sx / n) ** 2
+        var_y = syy / n - (sy / n) ** 2
+        cov = sxy / n - (sx / n) * (sy / n)
+        if var_x <= 0 or var_y <= 0:
+            return None
+        beta = cov / var_x
+        corr = cov / np.sqrt(var_x * var_y)
+        return beta, corr, (sy - sx) * 100
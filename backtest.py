@@ -0,0 +1,294 @@
+import argparse
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from functools import lru_cache
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytz
+
+from market_data import BAR_DATA_DIR, bar_file, load_bars, yahoo
+
+BASE_DIR = Path(__file__).parent
+RESULTS_DIR = BASE_DIR / "Backtest Results"
+
+EASTERN = pytz.timezone("US/Eastern")
+SESSION_OPEN_MINUTE = 9 * 60 + 30
+SESSION_MINUTES = 390
+
+EXIT_TARGET = 0
+EXIT_STOP = 1
+EXIT_CLOSE = 2
+EXIT_REASONS = np.array(["target", "stop", "close"])
+
+
+def stored_symbols():
+    if not BAR_DATA_DIR.exists():
+        return []
+    return sorted(p.stem for p in BAR_DATA_DIR.glob("*.csv"))
+
+
+def fetch_bars(symbol):
+    # yfinance only serves ~7 days of 1m bars per request, so run this daily to build up history
+    df = yahoo.download(symbol, period="7d", interval="1m")
+    if df.empty:
+        return 0
+
+    if isinstance(df.columns, pd.MultiIndex):
+        df = df.xs(symbol, axis=1, level=-1)
+    df = df[["Open", "High", "Low", "Close", "Volume"]]
+    df.index = df.index.tz_convert("UTC")
+
+    existing = load_bars(symbol)
+    if existing is not None:
+        df = pd.concat([existing, df])
+        df = df[~df.index.duplicated(keep="last")].sort_index()
+
+    BAR_DATA_DIR.mkdir(exist_ok=True)
+    df.to_csv(bar_file(symbol))
+    return len(df)
+
+
+def day_matrices(df):
+    # Lay the bars out as one row per session and one column per minute after the open.
+    # Missing minutes stay NaN, which compares False in every hit test below.
+    local = df.index.tz_convert(EASTERN)
+    minute = np.asarray(local.hour * 60 + local.minute) - SESSION_OPEN_MINUTE
+    in_session = (minute >= 0) & (minute < SESSION_MINUTES)
+
+    session_local = local[in_session]
+    day_keys = session_local.normalize().asi8
+    days, first, row = np.unique(day_keys, return_index=True, return_inverse=True)
+    col = minute[in_session]
+
+    shape = (len(days), SESSION_MINUTES)
+    mats = {}
+    for name in ("High", "Low", "Close"):
+        mat = np.full(shape, np.nan)
+        mat[row, col] = df[name].to_numpy(dtype=np.float64)[in_session]
+        mats[name] = mat
+
+    dates = session_local[first].date
+    return dates, mats["High"], mats["Low"], mats["Close"]
+
+
+@lru_cache(maxsize=4)
+def symbol_matrices(symbol):
+    df = load_bars(symbol)
+    if df is None or df.empty:
+        return None
+    return day_matrices(df)
+
+
+def first_true(mask):
+    # Column of the first True per row, or the row width when there is none
+    found = mask.any(axis=1)
+    return np.where(found, mask.argmax(axis=1), mask.shape[1])
+
+
+def run_rule(high, low, close, target_pct, stop_pct, entry_minute):
+    # Market buy at the close of the entry minute, sell at entry * (1 + target) like the red
+    # "Sell Price" line in the app, optional stop below entry, otherwise flat at the last bar.
+    entry = close[:, entry_minute]
+    traded = ~np.isnan(entry)
+
+    after_high = high[:, entry_minute + 1:]
+    after_low = low[:, entry_minute + 1:]
+    after_close = close[:, entry_minute + 1:]
+    width = after_close.shape[1]
+
+    target = entry * (1 + target_pct / 100)
+    target_at = first_true(after_high >= target[:, None])
+    if stop_pct > 0:
+        stop = entry * (1 - stop_pct / 100)
+        stop_at = first_true(after_low <= stop[:, None])
+    else:
+        stop = np.full_like(entry, np.nan)
+        stop_at = np.full(len(entry), width)
+
+    has_close = ~np.isnan(after_close)
+    last_at = width - 1 - has_close[:, ::-1].argmax(axis=1)
+    traded &= has_close.any(axis=1)
+
+    # Stop wins ties: within one bar we cannot tell which level printed first
+    reason = np.full(len(entry), EXIT_CLOSE)
+    reason[target_at < width] = EXIT_TARGET
+    reason[(stop_at < width) & (stop_at <= target_at)] = EXIT_STOP
+
+    rows = np.arange(len(entry))
+    exit_price = np.choose(reason, [target, stop, after_close[rows, last_at]])
+    exit_at = np.choose(reason, [target_at, stop_at, last_at])
+
+    return (
+        np.flatnonzero(traded),
+        entry[traded],
+        exit_price[traded],
+        entry_minute + 1 + exit_at[traded],
+        reason[traded],
+    )
+
+
+def run_task(symbol, params, amount):
+    matrices = symbol_matrices(symbol)
+    if matrices is None:
+        return []
+    dates, high, low, close = matrices
+
+    results = []
+    for target_pct, stop_pct, entry_minute in params:
+        if not 0 <= entry_minute < SESSION_MINUTES - 1:
+            continue
+        rows, entry, exit_price, exit_minute, reason = run_rule(high, low, close, target_pct, stop_pct, entry_minute)
+        returns = exit_price / entry - 1
+        results.append({
+            "symbol": symbol,
+            "target_pct": target_pct,
+            "stop_pct": stop_pct,
+            "entry_minute": entry_minute,
+            "date": dates[rows],
+            "exit_minute": exit_minute,
+            "entry_price": entry,
+            "exit_price": exit_price,
+            "exit_reason": EXIT_REASONS[reason],
+            "return_pct": returns * 100,
+            "pnl": returns * amount,
+        })
+    return results
+
+
+def minute_to_time(minutes):
+    minutes = SESSION_OPEN_MINUTE + np.asarray(minutes)
+    return [f"{m // 60:02d}:{m % 60:02d}" for m in minutes]
+
+
+def trades_frame(result):
+    n = len(result["date"])
+    return pd.DataFrame({
+        "symbol": [result["symbol"]] * n,
+        "target_pct": result["target_pct"],
+        "stop_pct": result["stop_pct"],
+        "entry_minute": result["entry_minute"],
+        "date": result["date"],
+        "entry_time": minute_to_time(np.full(n, result["entry_minute"])),
+        "exit_time": minute_to_time(result["exit_minute"]),
+        "entry_price": result["entry_price"],
+        "exit_price": result["exit_price"],
+        "exit_reason": result["exit_reason"],
+        "return_pct": result["return_pct"],
+        "pnl": result["pnl"],
+    })
+
+
+def summarize(result):
+    pnl = result["pnl"]
+    wins = pnl[pnl > 0]
+    losses = pnl[pnl < 0]
+    equity = np.cumsum(pnl)
+    drawdown = np.maximum.accumulate(np.concatenate([[0.0], equity]))[1:] - equity
+    return {
+        "symbol": result["symbol"],
+        "target_pct": result["target_pct"],
+        "stop_pct": result["stop_pct"],
+        "entry_minute": result["entry_minute"],
+        "trades": len(pnl),
+        "win_rate": len(wins) / len(pnl) if len(pnl) else np.nan,
+        "target_hits": int(np.sum(result["exit_reason"] == "target")),
+        "stop_hits": int(np.sum(result["exit_reason"] == "stop")),
+        "avg_return_pct": result["return_pct"].mean() if len(pnl) else np.nan,
+        "total_pnl": pnl.sum(),
+        "max_drawdown": drawdown.max() if len(pnl) else 0.0,
+        "profit_factor": wins.sum() / -losses.sum() if len(losses) else np.inf,
+    }
+
+
+def param_grid(targets, stops, entries):
+    return list(itertools.product(targets, stops, entries))
+
+
+def run_backtest(symbols, params, amount=50.0, workers=None):
+    workers = workers or os.cpu_count() or 1
+    # Split the grid so that every worker has something to do even with few symbols
+    chunks = max(1, min(len(params), math.ceil(workers * 4 / max(len(symbols), 1))))
+    chunk_size = math.ceil(len(params) / chunks)
+    tasks = [(symbol, params[i:i + chunk_size]) for symbol in symbols for i in range(0, len(params), chunk_size)]
+
+    results = []
+    if workers == 1:
+        for symbol, chunk in tasks:
+            results.extend(run_task(symbol, chunk, amount))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_task, symbol, chunk, amount) for symbol, chunk in tasks]
+            for future in as_completed(futures):
+                results.extend(future.result())
+
+    summary = pd.DataFrame([summarize(r) for r in results])
+    trades = pd.concat([trades_frame(r) for r in results], ignore_index=True) if results else pd.DataFrame()
+    return trades, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backtest the +1% exit rule on stored 1-minute bars.")
+    parser.add_argument("symbols", nargs="*", help="Symbols to test (default: everything in 'Bar Data')")
+    parser.add_argument("--fetch", action="store_true", help="Download the latest 1m bars into 'Bar Data' first")
+    parser.add_argument("--targets", type=float, nargs="+", default=[1.0], help="Take-profit %% above entry")
+    parser.add_argument("--stops", type=float, nargs="+", default=[1.0], help="Stop-loss %% below entry (0 = none)")
+    parser.add_argument("--entries", type=int, nargs="+", default=[0], help="Entry minute after the 9:30 open")
+    parser.add_argument("--amount", type=float, default=50.0, help="Dollars per trade")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # A negative entry would wrap around to the end of the session and an entry in the last
+    # minute leaves no bar to exit on
+    last_entry = SESSION_MINUTES - 2
+    bad_entries = [e for e in args.entries if not 0 <= e <= last_entry]
+    if bad_entries:
+        parser.error(f"--entries must be between 0 and {last_entry}, got {bad_entries}")
+    if any(t <= 0 for t in args.targets):
+        parser.error("--targets must be greater than 0")
+    if any(s < 0 for s in args.stops):
+        parser.error("--stops must be 0 (no stop) or greater")
+    if args.amount <= 0:
+        parser.error("--amount must be greater than 0")
+
+    symbols = [s.upper() for s in args.symbols]
+    if args.fetch:
+        for symbol in symbols or stored_symbols():
+            try:
+                print(f"{symbol}: {fetch_bars(symbol)} bars stored")
+            except Exception as e:
+                print(f"Could not fetch bars for {symbol}: {e}")
+    symbols = symbols or stored_symbols()
+    if not symbols:
+        print(f"⚠ No stored bars found in {BAR_DATA_DIR}. Run with --fetch and a list of symbols first.")
+        return
+
+    params = param_grid(args.targets, args.stops, args.entries)
+    started = time.perf_counter()
+    trades, summary = run_backtest(symbols, params, args.amount, args.workers)
+    elapsed = time.perf_counter() - started
+
+    if summary.empty:
+        print("⚠ No trades generated.")
+        return
+
+    RESULTS_DIR.mkdir(exist_ok=True)
+    stamp = datetime.now().strftime("%d%b%y_%H.%M.%S")
+    trades.to_csv(RESULTS_DIR / f"{stamp}_trades.csv", index=False)
+    summary.to_csv(RESULTS_DIR / f"{stamp}_summary.csv", index=False)
+
+    by_params = summary.groupby(["target_pct", "stop_pct", "entry_minute"]).agg(
+        trades=("trades", "sum"), total_pnl=("total_pnl", "sum"), avg_return_pct=("avg_return_pct", "mean")
+    ).sort_values("total_pnl", ascending=False)
+    print(by_params.to_string())
+    print(f"✅ {len(trades)} trades across {len(symbols)} symbols and {len(params)} parameter sets in {elapsed:.1f}s")
+    print(f"Results written to {RESULTS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+BAR_DATA_DIR = Path(__file__).parent / "Bar Data"
+
+PERIOD_DAYS = {"1d": 1, "2d": 2, "5d": 5, "7d": 7, "1mo": 30}
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class _Flight:
+    def __init__(self, period_days):
+        self.period_days = period_days
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+def last_sessions(df, days):
+    # Narrow a multi-day frame to its last `days` trading sessions, like asking yfinance for a shorter period
+    if df.empty:
+        return df
+    dates = df.index.normalize()
+    sessions = dates.unique()
+    if len(sessions) <= days:
+        return df
+    return df[dates >= sessions[-days]]
+
+
+def ticker_frame(df, symbol):
+    # One symbol's columns from a (Price, Ticker) multi-ticker download, without the rows it is missing
+    if isinstance(df.columns, pd.MultiIndex):
+        if symbol not in df.columns.get_level_values(-1):
+            return df.iloc[0:0, 0:0]
+        df = df.xs(symbol, axis=1, level=-1)
+    return df.dropna()
+
+
+class YahooClient:
+    # Every Yahoo request in the app goes through here. Identical in-flight requests share one
+    # download, narrower periods are cut from a wider frame fetched in the last `ttl` seconds,
+    # and a token bucket paces bursts so we stay under Yahoo's throttling.
+    # Returned frames are shared between callers and must not be modified in place.
+    def __init__(self, rate=2.0, burst=4, ttl=15.0):
+        self.bucket = TokenBucket(rate, burst)
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.cache = {}
+        self.in_flight = {}
+        self.info_cache = {}
+        self.info_in_flight = {}
+        self.period_cache = {}
+        self.period_in_flight = {}
+
+    def download(self, symbol, period="1d", interval="1m", max_age=None):
+        if period not in PERIOD_DAYS:
+            return self._download_period(symbol, period, interval, max_age)
+        return self.download_many([symbol], period, interval, max_age)[symbol]
+
+    def _download_period(self, symbol, period, interval, max_age):
+        # Periods that can't be cut from a wider frame (ytd, max, ...) are only shared for the exact same request
+        key = (symbol, period, interval)
+        max_age = self.ttl if max_age is None else max_age
+        with self.lock:
+            cached = self.period_cache.get(key)
+            if cached and time.monotonic() - cached[0] <= max_age:
+                return cached[1]
+            flight = self.period_in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(0)
+                self.period_in_flight[key] = flight
+
+        if leader:
+            try:
+                flight.result = ticker_frame(self._fetch([symbol], period, interval), symbol)
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self.lock:
+                    if flight.result is not None and not flight.result.empty:
+                        self.period_cache[key] = (time.monotonic(), flight.result)
+                    del self.period_in_flight[key]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+    def download_many(self, symbols, period="1d", interval="1m", max_age=None):
+        # Symbols that are neither cached nor already in flight are fetched together in one request
+        days = PERIOD_DAYS[period]
+        max_age = self.ttl if max_age is None else max_age
+        results = {}
+        flights = {}
+        leading = []
+        with self.lock:
+            for symbol in symbols:
+                key = (symbol, interval)
+                cached = self.cache.get(key)
+                if cached and cached[0] >= days and time.monotonic() - cached[1] <= max_age:
+                    results[symbol] = last_sessions(cached[2], days)
+                    continue
+                flight = self.in_flight.get(key)
+                if flight is None or flight.period_days < days:
+                    flight = _Flight(days)
+                    self.in_flight[key] = flight
+                    leading.append(symbol)
+                flights[symbol] = flight
+
+        if leading:
+            try:
+                df = self._fetch(leading, period, interval)
+                for symbol in leading:
+                    flights[symbol].result = ticker_frame(df, symbol)
+            except Exception as e:
+                for symbol in leading:
+                    flights[symbol].error = e
+            finally:
+                with self.lock:
+                    now = time.monotonic()
+                    for symbol in leading:
+                        key = (symbol, interval)
+                        flight = flights[symbol]
+                        # A narrower download finishing late must not replace a fresh wider frame
+                        cached = self.cache.get(key)
+                        wider_fresh = cached and cached[0] > days and now - cached[1] <= self.ttl
+                        if flight.result is not None and not flight.result.empty and not wider_fresh:
+                            self.cache[key] = (days, now, flight.result)
+                        if self.in_flight.get(key) is flight:
+                            del self.in_flight[key]
+                        flight.done.set()
+
+        for symbol, flight in flights.items():
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            results[symbol] = last_sessions(flight.result, days)
+        return results
+
+    def _fetch(self, symbols, period, interval):
+        self.bucket.acquire()
+        df = yf.download(symbols, period=period, interval=interval, progress=False, auto_adjust=True)
+        if not isinstance(df.columns, pd.MultiIndex):
+            df.dropna(inplace=True)
+        return df
+
+    def info(self, symbol):
+        with self.lock:
+            if symbol in self.info_cache:
+                return self.info_cache[symbol]
+            flight = self.info_in_flight.get(symbol)
+            leader = flight is None
+            if leader:
+                flight = _Flight(0)
+                self.info_in_flight[symbol] = flight
+
+        if leader:
+            try:
+                self.bucket.acquire()
+                flight.result = yf.Ticker(symbol).info
+                with self.lock:
+                    self.info_cache[symbol] = flight.result
+            except Exception as e:
+                flight.error = e
+            finally:
+                with self.lock:
+                    del self.info_in_flight[symbol]
+                flight.done.set()
+        else:
+            flight.done.wait()
+
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+
+
+yahoo = YahooClient()
+
+
+def bar_file(symbol):
+    return BAR_DATA_DIR / f"{symbol}.csv"
+
+
+def load_bars(symbol):
+    # Stored 1-minute bars for a symbol (UTC index), as written by `backtest.py --fetch`
+    path = bar_file(symbol)
+    if not path.exists():
+        return None
+    df = pd.read_csv(path, index_col=0)
+    df.index = pd.to_datetime(df.index, utc=True)
+    return df
+
+
+SECONDS_PER_DAY = 86400
+# Shifting UTC back 5 hours puts every US session bar (pre-market through after-hours) on its
+# Eastern calendar date in both EST and EDT, so day boundaries need no timezone lookups.
+SESSION_DAY_SHIFT = 5 * 3600
+
+
+def session_day(ts):
+    return (ts - SESSION_DAY_SHIFT) // SECONDS_PER_DAY
+
+
+def price_column(df, name):
+    column = df[name]
+    if isinstance(column, pd.DataFrame):
+        column = column.iloc[:, 0]
+    return column
+
+
+class StreamingIndicators:
+    # Per-bar indicator values kept alongside a BarBuffer. Bar i is computed from bar i - 1 only
+    # (running sums, prefix sums and recursive averages), so appending or revising a bar is O(1).
+    __slots__ = ("ema_spans", "std_window", "atr_period", "band_width", "cum_pv", "cum_v", "sum_c", "sum_cc",
+                 "vwap", "ema_fast", "ema_slow", "mean", "std", "atr",
+                 "bollinger_upper", "bollinger_lower", "keltner_upper", "keltner_lower")
+
+    ARRAYS = ("cum_pv", "cum_v", "sum_c", "sum_cc", "vwap", "ema_fast", "ema_slow", "mean", "std", "atr",
+              "bollinger_upper", "bollinger_lower", "keltner_upper", "keltner_lower")
+
+    def __init__(self, capacity, ema_spans=(9, 21), std_window=20, atr_period=14, band_width=2.0):
+        self.ema_spans = ema_spans
+        self.std_window = std_window
+        self.atr_period = atr_period
+        self.band_width = band_width
+        for name in self.ARRAYS:
+            setattr(self, name, np.empty(capacity, dtype=np.float64))
+
+    def update(self, bars, i):
+        close = bars.close[i]
+        high = bars.high[i]
+        low = bars.low[i]
+        volume = bars.volume[i]
+        new_session = i == 0 or bars.day_starts[bars.days - 1] == i
+
+        # VWAP restarts at every session open
+        typical = (high + low + close) / 3
+        if new_session:
+            self.cum_pv[i] = typical * volume
+            self.cum_v[i] = volume
+        else:
+            self.cum_pv[i] = self.cum_pv[i - 1] + typical * volume
+            self.cum_v[i] = self.cum_v[i - 1] + volume
+        self.vwap[i] = self.cum_pv[i] / self.cum_v[i] if self.cum_v[i] > 0 else np.nan
+
+        fast, slow = self.ema_spans
+        if i == 0:
+            self.ema_fast[i] = self.ema_slow[i] = close
+            self.sum_c[i] = close
+            self.sum_cc[i] = close * close
+            self.atr[i] = high - low
+        else:
+            self.ema_fast[i] = self.ema_fast[i - 1] + 2 / (fast + 1) * (close - self.ema_fast[i - 1])
+            self.ema_slow[i] = self.ema_slow[i - 1] + 2 / (slow + 1) * (close - self.ema_slow[i - 1])
+            self.sum_c[i] = self.sum_c[i - 1] + close
+            self.sum_cc[i] = self.sum_cc[i - 1] + close * close
+            prev_close = bars.close[i - 1]
+            true_range = max(high - low, abs(high - prev_close), abs(low - prev_close))
+            # Wilder smoothing
+            self.atr[i] = self.atr[i - 1] + (true_range - self.atr[i - 1]) / self.atr_period
+
+        # Rolling mean and standard deviation from prefix-sum differences
+        n = min(self.std_window, i + 1)
+        total = self.sum_c[i] - (self.sum_c[i - n] if i >= n else 0.0)
+        total_sq = self.sum_cc[i] - (self.sum_cc[i - n] if i >= n else 0.0)
+        mean = total / n
+        std = np.sqrt(max(total_sq / n - mean * mean, 0.0))
+        self.mean[i] = mean
+        self.std[i] = std
+
+        # Bollinger bands around the rolling mean, Keltner channel around the slow EMA
+        self.bollinger_upper[i] = mean + self.band_width * std
+        self.bollinger_lower[i] = mean - self.band_width * std
+        self.keltner_upper[i] = self.ema_slow[i] + self.band_width * self.atr[i]
+        self.keltner_lower[i] = self.ema_slow[i] - self.band_width * self.atr[i]
+
+    def shift(self, cut, remaining):
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:remaining] = array[cut:cut + remaining]
+
+    def grow(self, capacity, size):
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:size] = old[:size]
+            setattr(self, name, new)
+
+
+class BarBuffer:
+    # Preallocated, append-only bars for one symbol and interval. `ts` holds epoch seconds and
+    # `x` the same instants as Matplotlib date numbers so views can go straight to Line2D.set_data.
+    # Old sessions are dropped in place once the buffer fills, so memory stays flat all day.
+    __slots__ = ("ts", "x", "close", "high", "low", "volume", "size", "keep_days", "day_keys", "day_starts", "days",
+                 "indicators", "_scratch_x", "_scratch_y")
+
+    ARRAYS = ("ts", "x", "close", "high", "low", "volume")
+
+    def __init__(self, capacity=2048, keep_days=3):
+        self.ts = np.empty(capacity, dtype=np.int64)
+        self.x = np.empty(capacity, dtype=np.float64)
+        self.close = np.empty(capacity, dtype=np.float64)
+        self.high = np.empty(capacity, dtype=np.float64)
+        self.low = np.empty(capacity, dtype=np.float64)
+        self.volume = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+        self.keep_days = keep_days
+        self.day_keys = np.empty(keep_days + 8, dtype=np.int64)
+        self.day_starts = np.empty(keep_days + 8, dtype=np.int64)
+        self.days = 0
+        self.indicators = StreamingIndicators(capacity)
+        self._scratch_x = np.empty(capacity + 1, dtype=np.float64)
+        self._scratch_y = np.empty(capacity + 1, dtype=np.float64)
+
+    def __len__(self):
+        return self.size
+
+    @property
+    def capacity(self):
+        return len(self.ts)
+
+    def last_ts(self):
+        return self.ts[self.size - 1] if self.size else None
+
+    def append(self, ts, close, high=None, low=None, volume=0.0):
+        high = close if high is None else high
+        low = close if low is None else low
+        n = self.size
+        if n and ts <= self.ts[n - 1]:
+            if ts == self.ts[n - 1]:
+                # Yahoo revises the still-forming minute; overwrite it instead of appending
+                self.close[n - 1] = close
+                self.high[n - 1] = high
+                self.low[n - 1] = low
+                self.volume[n - 1] = volume
+                self.indicators.update(self, n - 1)
+            return
+        if n == self.capacity:
+            self._make_room(1)
+            n = self.size
+
+        day = session_day(ts)
+        if not self.days or day != self.day_keys[self.days - 1]:
+            if self.days == len(self.day_keys):
+                self._drop_days(1)
+                n = self.size
+            self.day_keys[self.days] = day
+            self.day_starts[self.days] = n
+            self.days += 1
+
+        self.ts[n] = ts
+        self.x[n] = ts / SECONDS_PER_DAY
+        self.close[n] = close
+        self.high[n] = high
+        self.low[n] = low
+        self.volume[n] = volume
+        self.size = n + 1
+        self.indicators.update(self, n)
+
+    def extend(self, ts, close, high=None, low=None, volume=None):
+        high = close if high is None else high
+        low = close if low is None else low
+        volume = np.zeros(len(ts)) if volume is None else volume
+        for row in zip(ts.tolist(), close.tolist(), high.tolist(), low.tolist(), volume.tolist()):
+            self.append(*row)
+
+    def merge_frame(self, df):
+        # Only the rows at or after our last bar are converted, so a refresh touches a handful of values
+        if df.empty:
+            return
+        index = df.index
+        last = self.last_ts()
+        start = 0
+        if last is not None:
+            start = index.searchsorted(pd.Timestamp(int(last), unit="s", tz="UTC"))
+            if start == len(index):
+                return
+        tail = df.iloc[start:]
+        ts = tail.index.as_unit("s").asi8
+        close = price_column(tail, "Close").to_numpy(dtype=np.float64)
+        high = price_column(tail, "High").to_numpy(dtype=np.float64) if "High" in tail else None
+        low = price_column(tail, "Low").to_numpy(dtype=np.float64) if "Low" in tail else None
+        volume = price_column(tail, "Volume").to_numpy(dtype=np.float64) if "Volume" in tail else None
+        self.extend(ts, close, high, low, volume)
+
+    def _make_room(self, needed):
+        if self.days > self.keep_days:
+            self._drop_days(self.days - self.keep_days)
+        if self.size + needed > self.capacity:
+            self._grow(max(self.capacity * 2, self.size + needed))
+
+    def _drop_days(self, count):
+        cut = self.day_starts[count] if count < self.days else self.size
+        remaining = self.size - cut
+        for name in self.ARRAYS:
+            array = getattr(self, name)
+            array[:remaining] = array[cut:self.size]
+        self.indicators.shift(cut, remaining)
+        self.size = remaining
+
+        kept = self.days - count
+        self.day_keys[:kept] = self.day_keys[count:self.days]
+        self.day_starts[:kept] = self.day_starts[count:self.days] - cut
+        self.days = kept
+
+    def _grow(self, capacity):
+        for name in self.ARRAYS:
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+        self.indicators.grow(capacity, self.size)
+        self._scratch_x = np.empty(capacity + 1, dtype=np.float64)
+        self._scratch_y = np.empty(capacity + 1, dtype=np.float64)
+
+    def day_index(self, day):
+        for i in range(self.days - 1, -1, -1):
+            if self.day_keys[i] == day:
+                return i
+        return None
+
+    def day_bounds(self, i):
+        if i < 0:
+            i += self.days
+        end = self.day_starts[i + 1] if i + 1 < self.days else self.size
+        return self.day_starts[i], end
+
+    def view(self, start, end):
+        return self.x[start:end], self.close[start:end]
+
+    def with_previous_close(self, start, end):
+        # The session's bars preceded by the prior bar's close, placed one minute before the open
+        n = end - start
+        xs = self._scratch_x[:n + 1]
+        ys = self._scratch_y[:n + 1]
+        xs[0] = self.x[start] - 60 / SECONDS_PER_DAY
+        ys[0] = self.close[start - 1]
+        xs[1:] = self.x[start:end]
+        ys[1:] = self.close[start:end]
+        return xs, ys
+
+    def normalized(self, start, end, ref_price):
+        # Percent change from ref_price, written into the scratch array instead of a new one
+        ys = self._scratch_y[:end - start]
+        np.divide(self.close[start:end], ref_price, out=ys)
+        ys *= 100
+        ys -= 100
+        return self.x[start:end], ys
+
+
+class BarStore:
+    # One BarBuffer per (symbol, interval), shared by every panel showing that symbol
+    def __init__(self):
+        self.buffers = {}
+
+    def get(self, symbol, interval="1m"):
+        key = (symbol, interval)
+        bars = self.buffers.get(key)
+        if bars is None:
+            bars = BarBuffer()
+            self.buffers[key] = bars
+        return bars
+
+    def merge(self, symbol, df, interval="1m"):
+        bars = self.get(symbol, interval)
+        bars.merge_frame(df)
+        return bars
+
+    def snapshot(self, sessions=2):
+        # The last few sessions of every buffer as plain arrays, keyed for np.savez
+        keys = []
+        arrays = {}
+        for (symbol, interval), bars in self.buffers.items():
+            if not bars.days:
+                continue
+            start = bars.day_starts[max(0, bars.days - sessions)]
+            i = len(keys)
+            keys.append([symbol, interval])
+            for name in ("ts", "close", "high", "low", "volume"):
+                arrays[f"{name}_{i}"] = getattr(bars, name)[start:bars.size]
+        return keys, arrays
+
+    def restore(self, keys, arrays):
+        for i, (symbol, interval) in enumerate(keys):
+            self.get(symbol, interval).extend(*(arrays.get(f"{name}_{i}") for name in ("ts", "close", "high", "low", "volume")))
+
+
+bar_store = BarStore()
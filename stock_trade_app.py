@@ -1,16 +1,19 @@
+import argparse
+from abc import ABC, abstractmethod
 import tkinter as tk
 from tkinter import ttk, messagebox
-import yfinance as yf
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from datetime import datetime, time as dt_time
 import matplotlib.dates as mdates
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
 import pytz
 import pandas as pd
 import glob
+import json
 import webbrowser
 import numpy as np
 
@@ -22,6 +25,9 @@ from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from pathlib import Path
 
+from analytics import Portfolio, RelativeStrength
+from market_data import bar_store, load_bars, session_day, yahoo
+
 BASE_DIR = Path(__file__).parent
 
 log_dir = BASE_DIR / "Log Files"
@@ -29,6 +35,12 @@ log_dir.mkdir(exist_ok=True)
 
 CHROME_DRIVER_PATH = BASE_DIR / "chromedriver.exe"
 CHROME_PROFILE_PATH = BASE_DIR / "ChromeSeleniumProfile"
+SNAPSHOT_PATH = log_dir / "session_snapshot.npz"
+DEFAULT_BENCHMARKS = ["^DJI", "^IXIC", "^GSPC"]
+OVERLAYS = ["VWAP", "EMA 9/21", "Bollinger (20, 2σ)", "Keltner (EMA 21, 2 ATR)"]
+FRIENDLY_LABELS = {"^DJI": "DOW", "^IXIC": "NASDAQ", "^GSPC": "S&P500"}
+CHECKPOINT_INTERVAL_MS = 60000
+HOVER_INTERVAL_MS = 16  # ~60 Hz, one mouse update per display frame
 
 def load_latest_tracked_tickers():
     log_dir = Path(__file__).parent / "Log Files"
@@ -42,13 +54,49 @@ def load_latest_tracked_tickers():
                     return line.strip().split(":")[1].split(",")
     return []
 
+def save_session_snapshot(trackers, index_tracker):
+    keys, arrays = bar_store.snapshot()
+    meta = {
+        "saved_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        "trackers": [tracker.session_state() for tracker in trackers],
+        "benchmarks": index_tracker.symbols,
+        "rs_benchmark": index_tracker.app.rs_benchmark,
+        "backend": {"name": index_tracker.app.backend.name, "state": index_tracker.app.backend.session_state()},
+        "bars": keys,
+    }
+    # Write to a temporary file first so a crash mid-write never leaves a broken snapshot
+    tmp_path = log_dir / "session_snapshot.tmp.npz"
+    np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp_path, SNAPSHOT_PATH)
+
+def load_session_snapshot():
+    if not SNAPSHOT_PATH.exists():
+        return None
+    try:
+        with np.load(SNAPSHOT_PATH, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            arrays = {name: data[name] for name in data.files if name != "meta"}
+        bar_store.restore(meta["bars"], arrays)
+        return meta
+    except Exception as e:
+        print(f"Could not load session snapshot: {e}")
+        return None
+
+def is_trading_hours(now):
+    # Trading hours in UTC (approximate; adjust for exchange if needed)
+    start_time = now.replace(hour=13, minute=30, second=0, microsecond=0)
+    end_time = now.replace(hour=20, minute=0, second=0, microsecond=0)
+    return start_time <= now <= end_time
+
 class MultiIndexTrackerFrame(ttk.LabelFrame):
-    def __init__(self, parent, initial_delay_ms):
+    def __init__(self, parent, app, initial_delay_ms, symbols=None):
         super().__init__(parent, text="Index Tracker")
+        self.app = app
         self.eastern = pytz.timezone("US/Eastern")
-        self.symbols = ["^DJI", "^IXIC", "^GSPC"]
+        self.symbols = list(symbols or DEFAULT_BENCHMARKS)
         self.refresh_interval_ms = 60000
-        self.last_cached_dfs = {}
+        in_trading_hours = is_trading_hours(datetime.now(pytz.UTC))
+        self.interval = "1m" if in_trading_hours else "5m"
 
         self.fig, self.ax = plt.subplots(figsize=(4, 2.5), dpi=100)
         formatter = mdates.DateFormatter('%I:%M %p', tz=self.eastern)
@@ -58,110 +106,135 @@ class MultiIndexTrackerFrame(ttk.LabelFrame):
         self.ax.grid(True)
 
         self.lines = {}
-        friendly_labels = {"^DJI": "DOW", "^IXIC": "NASDAQ", "^GSPC": "S&P500"}
-        for symbol in self.symbols:
-            line, = self.ax.plot([], [], label=friendly_labels.get(symbol, symbol))
-            self.lines[symbol] = line
-
-        self.ax.legend()
+        self.build_lines()
  
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.draw()
         self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=3, pady=3)
 
+        self.default_font = ("Helvetica", 15)
+        self.controls = ttk.Frame(self)
+        self.controls.pack(fill=tk.X, padx=2, pady=2)
+
+        self.benchmark_label = ttk.Label(self.controls, text="Benchmarks:", font=self.default_font)
+        self.benchmark_label.grid(row=0, column=0, sticky="e", padx=4)
+        self.benchmark_entry = ttk.Entry(self.controls, width=16, font=self.default_font)
+        self.benchmark_entry.insert(0, ",".join(self.symbols))
+        self.benchmark_entry.grid(row=0, column=1, sticky="w", padx=4)
+        self.apply_button = ttk.Button(self.controls, text="Apply", command=self.apply_benchmarks, style="Big.TButton")
+        self.apply_button.grid(row=0, column=2, sticky="w", padx=4)
+
+        self.rs_label = ttk.Label(self.controls, text="Relative strength vs:", font=self.default_font)
+        self.rs_label.grid(row=1, column=0, columnspan=2, sticky="e", padx=4, pady=(5,0))
+        self.rs_combo = ttk.Combobox(self.controls, values=self.symbols, width=7, state="readonly", font=self.default_font)
+        self.rs_combo.set(self.app.rs_benchmark)
+        self.rs_combo.grid(row=1, column=2, sticky="w", padx=4, pady=(5,0))
+        self.rs_combo.bind("<<ComboboxSelected>>", lambda event: self.app.set_rs_benchmark(self.rs_combo.get()))
+
+        # Paint whatever the session snapshot restored before the first network refresh
+        if any(bar_store.get(symbol, self.interval).days for symbol in self.symbols):
+            self.redraw(in_trading_hours)
+
         self.after(initial_delay_ms, self.update_graph)
 
+    def build_lines(self):
+        for line in self.lines.values():
+            line.remove()
+        self.lines = {}
+        for symbol in self.symbols:
+            line, = self.ax.plot([], [], label=FRIENDLY_LABELS.get(symbol, symbol))
+            self.lines[symbol] = line
+        self.ax.legend()
+
+    def apply_benchmarks(self):
+        symbols = []
+        for symbol in self.benchmark_entry.get().upper().split(","):
+            symbol = symbol.strip()
+            if symbol and symbol not in symbols:
+                symbols.append(symbol)
+        if not symbols:
+            messagebox.showerror("Input Error", "Enter at least one benchmark symbol, e.g. SPY,XLK,XLF")
+            return
+
+        self.symbols = symbols
+        self.build_lines()
+        self.rs_combo.config(values=symbols)
+        if self.app.rs_benchmark not in symbols:
+            self.rs_combo.set(symbols[0])
+            self.app.set_rs_benchmark(symbols[0])
+        self.canvas.draw_idle()
+        threading.Thread(target=self.update_plot, daemon=True).start()
+
     def update_graph(self):
-        self.update_plot()
+        threading.Thread(target=self.update_plot, daemon=True).start()
         self.after(self.refresh_interval_ms, self.update_graph)
 
     def update_plot(self):
+        # Runs on a worker thread; the bar buffers and the canvas are only touched back on the Tk thread
         try:
-            any_data = False
-            now = datetime.now(pytz.UTC)
-            today = now.date()
-            start_time = pd.Timestamp(f"{today} 13:30:00", tz="UTC")
-            end_time = pd.Timestamp(f"{today} 20:00:00", tz="UTC")
+            in_trading_hours = is_trading_hours(datetime.now(pytz.UTC))
+            interval = "1m" if in_trading_hours else "5m"
 
-            in_trading_hours = start_time <= now <= end_time
+            frames = yahoo.download_many(self.symbols, period="2d", interval=interval)
+            # Relative strength pairs 1-minute returns, so keep its benchmark on 1m bars even after hours
+            rs_benchmark = self.app.rs_benchmark
+            rs_frame = yahoo.download(rs_benchmark, period="2d", interval="1m") if interval != "1m" else None
 
-            for line in self.lines.values():
-                line.set_data([], [])
+            self.after(0, lambda: self.apply_downloads(frames, interval, in_trading_hours, rs_benchmark, rs_frame))
 
-            for child in self.ax.lines[3:]:
-                child.remove()
+        except Exception as e:
+            print(f"Graph update error in indices tracker: {e}")
 
-            for symbol in self.symbols:
-                interval = "1m" if in_trading_hours else "5m"
-                df_full = yf.download(symbol, period="2d", interval=interval, progress=False, auto_adjust=True)
-                df_full.dropna(inplace=True)
+    def apply_downloads(self, frames, interval, in_trading_hours, rs_benchmark, rs_frame):
+        self.interval = interval
+        for symbol, df_full in frames.items():
+            if not df_full.empty:
+                bar_store.merge(symbol, df_full, interval)
+        if rs_frame is not None and not rs_frame.empty:
+            bar_store.merge(rs_benchmark, rs_frame)
+        self.redraw(in_trading_hours)
+        self.app.refresh_relative_strength()
+
+    def redraw(self, in_trading_hours):
+        try:
+            any_data = False
+            min_time = max_time = None
+            today_key = session_day(int(datetime.now(pytz.UTC).timestamp()))
 
-                if df_full.empty:
-                    continue
+            for child in self.ax.lines[len(self.lines):]:
+                child.remove()
 
-                if isinstance(df_full.columns, pd.MultiIndex):
-                    close_col = ('Close', symbol)
-                    if close_col in df_full.columns:
-                        df_full = df_full[close_col].to_frame(name='Close')
-                    else:
-                        continue
-                elif symbol in df_full.columns:
-                    df_full = df_full[[symbol]].rename(columns={symbol: 'Close'})
-                elif 'Close' in df_full.columns:
-                    df_full = df_full[['Close']]
+            for symbol, line in self.lines.items():
+                bars = bar_store.get(symbol, self.interval)
+                today = bars.day_index(today_key) if bars.days else None
+
+                if in_trading_hours and today is not None:
+                    start, end = bars.day_bounds(today)
+                    # Yesterday's close is the bar just before today's first one
+                    ref_price = bars.close[start - 1] if start > 0 else bars.close[start]
+                elif bars.days:
+                    start, end = bars.day_bounds(-1)
+                    ref_price = bars.close[start]
                 else:
+                    line.set_data([], [])
                     continue
 
-                today_date = today
-                yesterday_date = today - pd.Timedelta(days=1)
-
-                df_today = df_full[df_full.index.date == today_date]
-                df_yesterday = df_full[df_full.index.date == yesterday_date]
-
-                most_recent_date = df_full.index.normalize().max()
-                df_most_recent = df_full[df_full.index.normalize() == most_recent_date]
-
-                if in_trading_hours and not df_today.empty:
-                    df = df_today
-                    if not df_yesterday.empty:
-                        ref_price = df_yesterday["Close"].iloc[-1]
-                        print(f"Using yesterday close: {ref_price}")
-                    else:
-                        ref_price = df["Close"].iloc[0]
-                        print(f"No yesterday data, using today first close: {ref_price}")
-                else:
-                    df = df_most_recent
-                    if df.empty or df["Close"].empty:
-                        continue
-                    ref_price = df["Close"].iloc[0]
-
-                normalized = (df["Close"] / ref_price * 100) - 100
-
-                self.lines[symbol].set_data(df.index.to_pydatetime(), normalized.values)
+                xs, normalized = bars.normalized(start, end, ref_price)
+                line.set_data(xs, normalized)
 
+                min_time = xs[0] if min_time is None else min(min_time, xs[0])
+                max_time = xs[-1] if max_time is None else max(max_time, xs[-1])
                 any_data = True
 
             if any_data:
                 self.ax.relim()
                 self.ax.autoscale_view()
 
-                eastern = pytz.timezone("US/Eastern")
-                formatter = mdates.DateFormatter('%I:%M %p', tz=eastern)
+                formatter = mdates.DateFormatter('%I:%M %p', tz=self.eastern)
                 self.ax.xaxis.set_major_formatter(formatter)
-    
-                all_times = []
-                for line in self.lines.values():
-                    xdata = line.get_xdata()
-                    if len(xdata) > 0:
-                        all_times.extend(xdata)
-
-                if all_times:
-                    min_time = min(all_times)
-                    max_time = max(all_times)
-                    self.ax.set_xlim([min_time, max_time])
 
-                else:
-                    print("⚠ No data points found to set xlim. Keeping autoscale only.")
+                if max_time > min_time:
+                    self.ax.set_xlim([min_time, max_time])
 
                 self.ax.legend()
                 self.canvas.draw()
@@ -173,27 +246,51 @@ class MultiIndexTrackerFrame(ttk.LabelFrame):
 
 
 class StockTrackerFrame(ttk.LabelFrame):
-    def __init__(self, parent, tracker_id, app, initial_delay_ms, initial_symbol):
+    def __init__(self, parent, tracker_id, app, initial_delay_ms, initial_symbol, saved_state=None):
         super().__init__(parent, text=f"Stock Tracker {tracker_id}")
         self.app = app
+        self.tracker_id = tracker_id
         self.eastern = pytz.timezone("US/Eastern")
         self.stock_symbol = initial_symbol if initial_symbol else ""
         self.amount = "50"
         self.refresh_interval_ms = 60000
         self.highlight_price = None
+        self.position_dollars = None
         self.last_cached_df = None
         self.tooltip = None
+        self.tooltip_label = None
+        self.tooltip_visible = False
+        self.tooltip_hide_job = None
+        self.pending_hover = None
+        self.hover_job = None
+        self.background = None
+        self.crosshair_shown = False
+        # Owned copies of the plotted series for hover lookups; the bar buffer's views are shared
+        # with other panels showing the same symbol and get rewritten by them
+        self.plot_x = np.empty(0)
+        self.plot_y = np.empty(0)
+        self.plot_size = 0
 
         self.default_font = ("Helvetica", 15)
 
-        try:
-            if self.stock_symbol:
-                company_name = yf.Ticker(self.stock_symbol).info.get('longName', self.stock_symbol)
-            else:
-                company_name = "No Symbol"
-        except Exception as e:
-            print(f"Could not fetch company name for {self.stock_symbol}: {e}")
-            company_name = self.stock_symbol or "No Symbol"
+        if saved_state:
+            self.stock_symbol = saved_state["symbol"]
+            self.amount = saved_state["amount"]
+            self.highlight_price = saved_state["highlight_price"]
+            self.position_dollars = saved_state.get("position_dollars")
+            company_name = saved_state["company_name"]
+            if self.highlight_price and self.position_dollars:
+                self.app.portfolio.open(self.tracker_id, self.stock_symbol, self.highlight_price, dollars=self.position_dollars)
+        else:
+            try:
+                if self.stock_symbol:
+                    company_name = yahoo.info(self.stock_symbol).get('longName', self.stock_symbol)
+                else:
+                    company_name = "No Symbol"
+            except Exception as e:
+                print(f"Could not fetch company name for {self.stock_symbol}: {e}")
+                company_name = self.stock_symbol or "No Symbol"
+        self.company_name = company_name
 
         self.fig, self.ax = plt.subplots(figsize=(4, 2.5), dpi=100)
         formatter = mdates.DateFormatter('%I:%M %p', tz=self.eastern)
@@ -206,6 +303,27 @@ class StockTrackerFrame(ttk.LabelFrame):
 
         self.line, = self.ax.plot([], [], label=self.stock_symbol)
         self.hlines = []
+        self.overlay_lines = {
+            "VWAP": self.ax.plot([], [], color="purple", linewidth=1.2),
+            "EMA 9/21": self.ax.plot([], [], [], [], linewidth=1),
+            "Bollinger (20, 2σ)": self.ax.plot([], [], [], [], color="gray", linestyle=":", linewidth=1),
+            "Keltner (EMA 21, 2 ATR)": self.ax.plot([], [], [], [], color="teal", linestyle="-.", linewidth=1),
+        }
+        self.overlay_lines["EMA 9/21"][0].set_color("orange")
+        self.overlay_lines["EMA 9/21"][1].set_color("brown")
+        saved_overlays = saved_state.get("overlays", []) if saved_state else []
+        self.overlay_vars = {name: tk.BooleanVar(value=name in saved_overlays) for name in OVERLAYS}
+
+        # Crosshair artists are animated: full draws skip them and hover blits them over a cached background
+        self.crosshair_v = self.ax.axvline(0, color="black", linewidth=0.8, animated=True, visible=False)
+        self.crosshair_h = self.ax.axhline(0, color="black", linewidth=0.8, animated=True, visible=False)
+        self.crosshair_label = self.ax.text(0, 0, "", fontsize=10, animated=True, visible=False,
+                                            bbox=dict(boxstyle="round", facecolor="lightyellow", alpha=0.9))
+        self.crosshair_artists = [self.crosshair_v, self.crosshair_h, self.crosshair_label]
+        self.crosshair_var = tk.BooleanVar(value=saved_state.get("crosshair", False) if saved_state else False)
+
+        self.rs_text = self.ax.text(0.01, 0.98, "", transform=self.ax.transAxes, va="top", ha="left", fontsize=9,
+                                    bbox=dict(boxstyle="round", facecolor="white", alpha=0.7, linewidth=0))
 
         self.canvas = FigureCanvasTkAgg(self.fig, master=self)
         self.canvas.draw()
@@ -213,6 +331,7 @@ class StockTrackerFrame(ttk.LabelFrame):
 
         self.canvas.mpl_connect("pick_event", self.on_title_click)
         self.canvas.mpl_connect("motion_notify_event", self.on_hover)
+        self.canvas.mpl_connect("draw_event", self.on_draw)
 
         self.controls = ttk.Frame(self)
         self.controls.pack(fill=tk.X, padx=2, pady=2)
@@ -248,6 +367,7 @@ class StockTrackerFrame(ttk.LabelFrame):
         self.bottom_controls.columnconfigure(0, weight=1)
         self.bottom_controls.columnconfigure(1, weight=1)
         self.bottom_controls.columnconfigure(2, weight=1)
+        self.bottom_controls.columnconfigure(3, weight=1)
 
         self.buy_button = ttk.Button(self.bottom_controls, text="Buy", command=self.mark_price_and_buy)
         self.buy_button.grid(row=1, column=0, sticky="n", padx=4)
@@ -259,15 +379,51 @@ class StockTrackerFrame(ttk.LabelFrame):
         self.reset_button = ttk.Button(self.bottom_controls, text="Reset", command=self.reset_buttons)
         self.reset_button.grid(row=1, column=2, sticky="n", padx=4)
 
+        self.overlay_button = ttk.Menubutton(self.bottom_controls, text="Overlays")
+        self.overlay_button.grid(row=1, column=3, sticky="n", padx=4)
+        self.overlay_menu = tk.Menu(self.overlay_button, tearoff=False, font=("Helvetica", 12))
+        for name in OVERLAYS:
+            self.overlay_menu.add_checkbutton(label=name, variable=self.overlay_vars[name], command=self.redraw)
+        self.overlay_menu.add_separator()
+        self.overlay_menu.add_checkbutton(label="Crosshair", variable=self.crosshair_var, command=self.hide_crosshair)
+        self.overlay_button["menu"] = self.overlay_menu
+
         style = ttk.Style()
         style.configure("Big.TButton", font=self.default_font)
+        style.configure("Big.TMenubutton", font=self.default_font)
         self.load_button.config(style="Big.TButton")
         self.buy_button.config(style="Big.TButton")
         self.sell_button.config(style="Big.TButton")
         self.reset_button.config(style="Big.TButton")
+        self.overlay_button.config(style="Big.TMenubutton")
+
+        if saved_state:
+            self.amount_label.config(text=saved_state["amount_label"])
+            self.buy_button.config(state=saved_state["buy_state"])
+            self.sell_button.config(state=saved_state["sell_state"])
+            self.reset_button.config(state=saved_state["reset_state"])
+
+        # Paint whatever the session snapshot restored before the first network refresh
+        if self.stock_symbol and bar_store.get(self.stock_symbol).days:
+            self.redraw()
 
         self.after(initial_delay_ms, self.update_graph)
 
+    def session_state(self):
+        return {
+            "symbol": self.stock_symbol,
+            "company_name": self.company_name,
+            "amount": self.amount_entry.get().strip(),
+            "amount_label": self.amount_label.cget("text"),
+            "highlight_price": self.highlight_price,
+            "position_dollars": self.position_dollars,
+            "buy_state": str(self.buy_button.cget("state")),
+            "sell_state": str(self.sell_button.cget("state")),
+            "reset_state": str(self.reset_button.cget("state")),
+            "overlays": [name for name, var in self.overlay_vars.items() if var.get()],
+            "crosshair": self.crosshair_var.get(),
+        }
+
     def on_title_click(self, event):
         if event.artist == self.title_text:
             self.hide_tooltip()
@@ -275,32 +431,103 @@ class StockTrackerFrame(ttk.LabelFrame):
             webbrowser.open(url)
 
     def on_hover(self, event):
+        # Keep only the latest motion event and handle it once per display frame
+        self.pending_hover = event
+        if self.hover_job is None:
+            self.hover_job = self.after(HOVER_INTERVAL_MS, self.process_hover)
+
+    def process_hover(self):
+        self.hover_job = None
+        event = self.pending_hover
+        self.pending_hover = None
+        if event is None:
+            return
+
         contains, _ = self.title_text.contains(event)
         if contains:
-            self.show_tooltip(event)
+            self.show_tooltip(f"Current {self.stock_symbol} News")
         else:
             self.hide_tooltip()
+        self.update_crosshair(event)
+
+    def on_draw(self, event):
+        # A full draw wipes the blitted crosshair, so cache the fresh background without it
+        self.background = self.canvas.copy_from_bbox(self.fig.bbox)
+        self.crosshair_shown = False
+
+    def keep_plot_data(self, xs, prices):
+        n = len(xs)
+        if n > len(self.plot_x):
+            self.plot_x = np.empty(n * 2)
+            self.plot_y = np.empty(n * 2)
+        np.copyto(self.plot_x[:n], xs)
+        np.copyto(self.plot_y[:n], prices)
+        self.plot_size = n
+
+    def update_crosshair(self, event):
+        if (not self.crosshair_var.get() or event.inaxes is not self.ax or self.background is None
+                or self.plot_size == 0):
+            self.hide_crosshair()
+            return
 
-    def show_tooltip(self, event):
+        xs = self.plot_x[:self.plot_size]
+        i = int(np.searchsorted(xs, event.xdata))
+        if i == len(xs) or (i > 0 and event.xdata - xs[i - 1] < xs[i] - event.xdata):
+            i -= 1
+        x = xs[i]
+        y = float(self.plot_y[i])
+
+        self.crosshair_v.set_xdata([x, x])
+        self.crosshair_h.set_ydata([y, y])
+        stamp = mdates.num2date(x, tz=self.eastern).strftime('%I:%M %p')
+        self.crosshair_label.set_text(f"{stamp}  ${y:.2f}")
+        self.crosshair_label.set_position((x, y))
+        left, right = self.ax.get_xlim()
+        self.crosshair_label.set_horizontalalignment("left" if x < (left + right) / 2 else "right")
+
+        self.canvas.restore_region(self.background)
+        for artist in self.crosshair_artists:
+            artist.set_visible(True)
+            self.ax.draw_artist(artist)
+            artist.set_visible(False)
+        self.canvas.blit(self.fig.bbox)
+        self.crosshair_shown = True
+
+    def hide_crosshair(self):
+        if self.crosshair_shown and self.background is not None:
+            self.canvas.restore_region(self.background)
+            self.canvas.blit(self.fig.bbox)
+        self.crosshair_shown = False
+
+    def show_tooltip(self, text):
+        # One tooltip window per tracker, shown and withdrawn rather than rebuilt on every hover
         if self.tooltip is None:
             self.tooltip = tk.Toplevel(self)
             self.tooltip.wm_overrideredirect(True)
             self.tooltip.attributes("-topmost", True)
-            label = tk.Label(self.tooltip,
-                             text=f"Current {self.stock_symbol} News",
-                             font=("Helvetica", 12),
-                             bg="yellow", relief="solid", bd=1)
-            label.pack(ipadx=5, ipady=2)
+            self.tooltip_label = tk.Label(self.tooltip,
+                                          font=("Helvetica", 12),
+                                          bg="yellow", relief="solid", bd=1)
+            self.tooltip_label.pack(ipadx=5, ipady=2)
+        self.tooltip_label.config(text=text)
         offset_x = 20
         offset_y = 10
         x = self.winfo_pointerx()
         y = self.winfo_pointery()
         self.tooltip.geometry(f"+{x + offset_x}+{y + offset_y}")
+        if not self.tooltip_visible:
+            self.tooltip.deiconify()
+            self.tooltip_visible = True
 
-        self.after(1000, self.hide_tooltip)
+        if self.tooltip_hide_job is not None:
+            self.after_cancel(self.tooltip_hide_job)
+        self.tooltip_hide_job = self.after(1000, self.hide_tooltip)
 
     def clear_all_horizontal_lines(self):
+        overlay_lines = [line for lines in self.overlay_lines.values() for line in lines]
         for line in list(self.ax.lines):
+            if line in overlay_lines or line in self.crosshair_artists:
+                continue
             ydata = line.get_ydata()        
             if len(ydata) > 0:
                 try:
@@ -314,17 +541,20 @@ class StockTrackerFrame(ttk.LabelFrame):
                         pass
 
     def hide_tooltip(self):
-        if self.tooltip is not None:
-            self.tooltip.destroy()
-            self.tooltip = None
+        if self.tooltip_hide_job is not None:
+            self.after_cancel(self.tooltip_hide_job)
+            self.tooltip_hide_job = None
+        if self.tooltip is not None and self.tooltip_visible:
+            self.tooltip.withdraw()
+            self.tooltip_visible = False
 
     def update_symbol(self):
         new_symbol = self.symbol_entry.get().strip().upper()
         if new_symbol:
             self.clear_all_horizontal_lines()
             try:
-                df = yf.download(new_symbol, period="1d", interval="1m", progress=False, auto_adjust=True)
-                df.dropna(inplace=True)
+                # Validate with the same 2d window update_plot uses so its download is shared
+                df = yahoo.download(new_symbol, period="2d", interval="1m")
                 if df.empty:
                     raise ValueError("No data returned.")
             except Exception:
@@ -332,9 +562,9 @@ class StockTrackerFrame(ttk.LabelFrame):
                 return
 
             self.stock_symbol = new_symbol
-            self.highlight_price = None
-            company_name = yf.Ticker(self.stock_symbol).info.get('longName', self.stock_symbol)
-            self.title_text = self.ax.set_title(company_name, fontsize=18, fontweight='bold')
+            self.close_position()
+            self.company_name = yahoo.info(self.stock_symbol).get('longName', self.stock_symbol)
+            self.title_text = self.ax.set_title(self.company_name, fontsize=18, fontweight='bold')
             self.line.set_label(self.stock_symbol)
             if self.ax.legend_:
                 self.ax.legend_.remove()
@@ -342,6 +572,39 @@ class StockTrackerFrame(ttk.LabelFrame):
             self.update_plot()
             self.canvas.draw_idle()
 
+    def draw_overlays(self, bars, start, end):
+        # Indicator values are maintained bar by bar in the shared bar store; this only hands over views
+        indicators = bars.indicators
+        series = {
+            "VWAP": [indicators.vwap],
+            "EMA 9/21": [indicators.ema_fast, indicators.ema_slow],
+            "Bollinger (20, 2σ)": [indicators.bollinger_upper, indicators.bollinger_lower],
+            "Keltner (EMA 21, 2 ATR)": [indicators.keltner_upper, indicators.keltner_lower],
+        }
+        xs = bars.x[start:end]
+        for name, lines in self.overlay_lines.items():
+            visible = self.overlay_vars[name].get()
+            for i, (line, values) in enumerate(zip(lines, series[name])):
+                line.set_visible(visible)
+                line.set_label(name if visible and i == 0 else f"_{name}")
+                if visible:
+                    line.set_data(xs, values[start:end])
+                else:
+                    line.set_data([], [])
+
+    def show_relative_strength(self, benchmark, stats):
+        if stats is None:
+            self.rs_text.set_text("")
+        else:
+            beta, corr, excess = stats
+            label = FRIENDLY_LABELS.get(benchmark, benchmark)
+            self.rs_text.set_text(f"vs {label}: β {beta:.2f}  ρ {corr:.2f}  excess {excess:+.2f}%")
+
+    def close_position(self):
+        self.highlight_price = None
+        self.position_dollars = None
+        self.app.close_position(self.tracker_id)
+
     def is_positive_number(self,value):
         try:
             return float(value) > 0
@@ -357,7 +620,7 @@ class StockTrackerFrame(ttk.LabelFrame):
         if not confirm:
             return
 
-        self.highlight_price = None
+        self.close_position()
         self.update_plot()
         self.buy_button.config(state="normal")
         self.sell_button.config(state="disabled")
@@ -366,41 +629,43 @@ class StockTrackerFrame(ttk.LabelFrame):
         self.canvas.draw()
 
     def mark_price_and_sell(self):
+        clicked_at = time.perf_counter()
         self.amount = self.amount_entry.get().strip()
         if not self.is_positive_number(self.amount):
             messagebox.showerror("Input Error", "Amount must be a positive number.")
             return
-        self.highlight_price = None
+        self.close_position()
         self.update_plot()
-        self.post_sale_action()
         self.amount_label.config(text="Amount ($):")
         self.app.enable_all_trackers()
         threading.Thread(
-            target=self.app._launch_selenium_order,
-            args=(self.stock_symbol, self.amount, "sell"),
+            target=self.app._launch_order,
+            args=(self.stock_symbol, self.amount, "sell", self, clicked_at),
             daemon=True
         ).start()
 
-    def post_sale_action(self):
-        current_price = self.get_current_price()
+    def post_sale_action(self, fill_price=None):
+        current_price = fill_price if fill_price is not None else self.get_current_price()
         if current_price is None:
             self.app.status_label.config(text="Could not get price to log sale.")
             return
 
         line = f"[{datetime.now().strftime('%H:%M:%S')}] Sale Price for {self.stock_symbol}: ${current_price:.2f}\n"
-        self.app.log_file.write(line)
-        self.app.log_file.flush()
+        with self.app.log_lock:
+            self.app.log_file.write(line)
+            self.app.log_file.flush()
         self.app.status_label.config(text=f"Sale logged at ${current_price:.2f}.")
 
-    def post_purchase_action(self):
-        current_price = self.get_current_price()
+    def post_purchase_action(self, fill_price=None):
+        current_price = fill_price if fill_price is not None else self.get_current_price()
         if current_price is None:
             self.app.status_label.config(text="Could not get price to log purchase.")
             return
 
         line = f"[{datetime.now().strftime('%H:%M:%S')}] Purchase Price for {self.stock_symbol}: ${current_price:.2f}\n"
-        self.app.log_file.write(line)
-        self.app.log_file.flush()
+        with self.app.log_lock:
+            self.app.log_file.write(line)
+            self.app.log_file.flush()
 
         with open(self.app.log_file.name, "r") as f:
             lines = f.readlines()
@@ -412,12 +677,20 @@ class StockTrackerFrame(ttk.LabelFrame):
                         self.highlight_price = float(match.group(1).replace(",", ""))
                     break
 
+        # This runs on the order thread; bar buffers, the portfolio and the canvas are only touched on the Tk thread
+        self.after(0, lambda: self.show_purchase(current_price))
+
+    def show_purchase(self, current_price):
         self.highlight_price = current_price
-        self.update_plot()
+        self.position_dollars = float(self.amount)
+        self.app.open_position(self.tracker_id, self.stock_symbol, current_price, self.position_dollars)
+        # Redraw from the bars already held rather than blocking the Tk thread on a download
+        self.redraw()
 
         self.app.status_label.config(text=f"Purchase logged & horizontals drawn at ${current_price:.2f}")
 
     def mark_price_and_buy(self):
+        clicked_at = time.perf_counter()
         self.amount = self.amount_entry.get().strip()
         if not self.is_positive_number(self.amount):
             messagebox.showerror("Input Error", "Amount must be a positive number.")
@@ -428,8 +701,8 @@ class StockTrackerFrame(ttk.LabelFrame):
         self.reset_button.config(state="normal")
         self.amount_label.config(text="Amount (Shares):")
         threading.Thread(
-            target=self.app._launch_selenium_order,
-            args=(self.stock_symbol, self.amount, "buy", self),
+            target=self.app._launch_order,
+            args=(self.stock_symbol, self.amount, "buy", self, clicked_at),
             daemon=True
         ).start()
 
@@ -437,109 +710,85 @@ class StockTrackerFrame(ttk.LabelFrame):
         if not self.stock_symbol:
             return None         
         try:
-            df = yf.download(self.stock_symbol, period="1d", interval="1m", progress=False, auto_adjust=True)
-            df.dropna(inplace=True)
+            df = yahoo.download(self.stock_symbol, period="1d", interval="1m", max_age=5)
             if not df.empty:
                 return df["Close"].iloc[-1].item()
         except Exception:
             return None
 
     def update_graph(self):
-        self.update_plot()
+        threading.Thread(target=self.fetch_in_background, daemon=True).start()
         self.after(self.refresh_interval_ms, self.update_graph)
 
+    def fetch_in_background(self):
+        symbol = self.stock_symbol
+        if not symbol:
+            return
+        try:
+            df_full = yahoo.download(symbol, period="2d", interval="1m")
+        except Exception as e:
+            print(f"Graph update error: {e}")
+            return
+        self.after(0, lambda: self.apply_download(symbol, df_full))
+
+    def apply_download(self, symbol, df_full):
+        if df_full.empty:
+            return
+        bar_store.merge(symbol, df_full)
+        if symbol == self.stock_symbol:
+            self.redraw()
+
     def update_plot(self):
         if not self.stock_symbol:
             return 
         try:
-            stock_symbol = self.stock_symbol
-            now = datetime.now(pytz.UTC)
-            today = now.date()
-            weekday = now.weekday()  # Monday=0, Sunday=6
-
-            # Define trading hours in UTC (approximate; adjust for exchange if needed)
-            start_time_utc = pd.Timestamp(f"{today} 13:30:00", tz="UTC")
-            end_time_utc = pd.Timestamp(f"{today} 20:00:00", tz="UTC")
+            # Always get 2 days to have yesterday for prepending
+            df_full = yahoo.download(self.stock_symbol, period="2d", interval="1m")
+            self.apply_download(self.stock_symbol, df_full)
 
-            in_trading_hours = start_time_utc <= now <= end_time_utc
+        except Exception as e:
+            print(f"Graph update error: {e}")
 
-            # Always get 2 days to have yesterday for prepending
-            df_full = yf.download(self.stock_symbol, period="2d", interval="1m", progress=False, auto_adjust=True)
-            df_full.dropna(inplace=True)
-            if df_full.empty:
-                return
-            # Keep index in UTC (default from yfinance)
-
-            # Normalize for clean slicing
-            date_index = df_full.index.normalize()
-            target_yesterday = pd.Timestamp(today - pd.Timedelta(days=1))
-            target_today = pd.Timestamp(today)
-            most_recent_date = date_index.max()
-
-            df_yesterday = df_full[date_index == target_yesterday]
-            df_today = df_full[date_index == target_today]
-
-            # 🔍 1) Handle outside trading hours first (including weekends)
-            if not in_trading_hours or weekday >= 5:
-                # Use full day slice for last available day
-                start_of_day = most_recent_date
-                end_of_day = start_of_day + pd.Timedelta(days=1)
-                df = df_full.loc[start_of_day:end_of_day - pd.Timedelta(microseconds=1)]
-                if not df.empty:
-                    ref_price = df["Close"].iloc[0]
-                    if isinstance(ref_price, pd.Series):
-                        ref_price = ref_price.iloc[0]
+    def redraw(self):
+        bars = bar_store.get(self.stock_symbol)
+        if not bars.days:
+            return
+        try:
+            now = datetime.now(pytz.UTC)
+            weekday = now.weekday()  # Monday=0, Sunday=6
+            in_trading_hours = is_trading_hours(now)
+            today = bars.day_index(session_day(int(now.timestamp())))
+
+            # 🔍 Trading hours during the week with bars for today: prepend the previous session's close
+            if in_trading_hours and weekday < 5 and today is not None:
+                start, end = bars.day_bounds(today)
+                if start > 0:
+                    xs, prices = bars.with_previous_close(start, end)
                 else:
-                    return
+                    xs, prices = bars.view(start, end)
 
-            # 🔍 2) Otherwise, handle trading hours during the week
+            # 🔍 Otherwise (after hours, weekends, no bars yet today) show the last available session
             else:
-                if not df_today.empty:
-                    if not df_yesterday.empty:
-                        last_close_yesterday = df_yesterday["Close"].iloc[-1]
-                        first_time_today = df_today.index[0] - pd.Timedelta(minutes=1)
-                        prepend_df = pd.DataFrame({"Close": [last_close_yesterday]}, index=[first_time_today])
-                        prepend_array = pd.concat([prepend_df, df_today])
-                        merged_series = prepend_array["Close"]
-                        df = merged_series.to_frame(name="Close")
-                        ref_price = last_close_yesterday
-                    else:
-                        df = df_today
-                        ref_price = df["Close"].iloc[0]
-                        if isinstance(ref_price, pd.Series):
-                            ref_price = ref_price.iloc[0]
-                else:
-                    # trading hours but no data? fallback
-                    start_of_day = most_recent_date
-                    end_of_day = start_of_day + pd.Timedelta(days=1)
-                    df = df_full.loc[start_of_day:end_of_day - pd.Timedelta(microseconds=1)]
-                    if not df.empty:
-                        ref_price = df["Close"].iloc[0]
-                        if isinstance(ref_price, pd.Series):
-                            ref_price = ref_price.iloc[0]
-                    else:
-                        return
+                start, end = bars.day_bounds(-1)
+                xs, prices = bars.view(start, end)
+
+            ref_price = float(prices[0])
+            self.app.on_price_update(self.stock_symbol, float(prices[-1]))
 
             # 🔍 Plotting
-            current_prices = df["Close"]
-            if isinstance(current_prices, pd.DataFrame):
-                current_prices = current_prices.iloc[:,0]
-            self.line.set_data(df.index, current_prices)
+            self.line.set_data(xs, prices)
             self.line.set_label(self.stock_symbol)
-            self.ax.relim()
+            self.keep_plot_data(xs, prices)
+            self.draw_overlays(bars, start, end)
+            self.ax.relim(visible_only=True)
             self.ax.autoscale_view()
 
             # x-axis still in UTC but format ticks in Eastern for readability
-            eastern = pytz.timezone("US/Eastern")
-            formatter = mdates.DateFormatter('%I:%M %p', tz=eastern)
+            formatter = mdates.DateFormatter('%I:%M %p', tz=self.eastern)
             self.ax.xaxis.set_major_formatter(formatter)
 
-            first_ts = df.index[0].to_pydatetime()
-            last_ts = df.index[-1].to_pydatetime()
-            if (first_ts <= start_of_day) and (last_ts >= end_of_day):
-                self.ax.set_xlim([start_of_day, end_of_day])
-            else:
-                self.ax.set_xlim([df.index[0], df.index[-1]])
+            if len(xs) > 1:
+                self.ax.set_xlim([xs[0], xs[-1]])
 
             # 🔍 Reference bands
             for h in self.hlines:
@@ -570,70 +819,52 @@ class StockTrackerFrame(ttk.LabelFrame):
             print(f"Graph update error: {e}")
 
 
-class StockApp(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("8-Tracker Stock Viewer with Normalized Index + Staggered Updates + Trade Autofill")
-        self.geometry("1700x950")
+class ExecutionBackend(ABC):
+    name = "Base"
+    check_label = "Check Backend"
 
-        tracked_tickers = load_latest_tracked_tickers()
+    def __init__(self, app):
+        self.app = app
 
-        now = datetime.now()
-        filename = now.strftime("%d%b%y_%H.%M.%S.txt")
-        log_path = log_dir / filename
-        self.log_file = open(log_path, "a")
-        self.log_file.write(f"Session started at {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
-        self.log_file.flush()
+    def start(self):
+        pass
 
-        self.default_font = ("Helvetica", 15)
+    @abstractmethod
+    def place_order(self, symbol, amount, action_text):
+        pass
 
-        self.top_frame = ttk.Frame(self)
-        self.top_frame.pack(fill=tk.BOTH, expand=True)
+    def check(self):
+        pass
 
-        ROWS = 2
-        COLS = 4
-        tracker_id = 1
-        symbol_index = 0
-        for r in range(ROWS):
-            self.top_frame.rowconfigure(r, weight=1)
-            for c in range(COLS):
-                self.top_frame.columnconfigure(c, weight=1)
-                delay_ms = ((r * COLS + c) % 8) * 1000
-                if r == 0 and c == 0:
-                    tracker = MultiIndexTrackerFrame(self.top_frame, delay_ms)
-                else:
-                    initial_symbol = tracked_tickers[symbol_index] if symbol_index < len(tracked_tickers) else ""
-                    tracker = StockTrackerFrame(self.top_frame, tracker_id, self, delay_ms, initial_symbol)
-                    tracker_id += 1
-                    symbol_index += 1
-                tracker.grid(row=r, column=c, padx=4, pady=4, sticky="nsew")
+    def stop(self):
+        pass
 
-        self.bottom_frame = ttk.Frame(self)
-        self.bottom_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+    # Backend state saved with the session snapshot and handed back on the next start
+    def session_state(self):
+        return None
 
-        self.check_button = ttk.Button(self.bottom_frame, text="Check Fidelity Page", command=self.check_fidelity_elements)
-        self.check_button.pack(side=tk.LEFT, padx=5)
-        self.check_button.config(style="Big.TButton")
+    def restore(self, state):
+        pass
 
-        self.status_label = ttk.Label(self.bottom_frame, text="Ready.", font=self.default_font)
-        self.status_label.pack(side=tk.LEFT, padx=20)
 
-        self.override_button = ttk.Button(self.bottom_frame, text="Override Enable Buttons", command=self.enable_all_trackers)
-        self.override_button.pack(side=tk.RIGHT, padx=5)
-        self.override_button.config(style="Big.TButton")
+class FidelitySeleniumBackend(ExecutionBackend):
+    name = "Fidelity"
+    check_label = "Check Fidelity Page"
+    order_tag = "Market, Cash"
 
-        threading.Thread(target=self.init_selenium_driver, daemon=True).start()
-        self.protocol("WM_DELETE_WINDOW", self.on_close)
+    def __init__(self, app):
+        super().__init__(app)
+        self.driver = None
 
-    def init_selenium_driver(self):
+    def start(self):
         try:
-            self.after(0, lambda: self.status_label.config(text="Starting browser..."))
+            self.app.after(0, lambda: self.app.status_label.config(text="Starting browser..."))
             self.driver = self.start_driver()
-            self.after(0, lambda: self.status_label.config(text="Browser started."))
+            self.app.after(0, lambda: self.app.status_label.config(text="Browser started."))
             self.start_keepalive_monitor()
         except Exception as e:
-            self.after(0, lambda e=e: self.status_label.config(text=f"Error starting browser: {e}"))
-            self.after(0, lambda: messagebox.showerror("Browser Error", f"Could not start Selenium:\n{e}"))
+            self.app.after(0, lambda e=e: self.app.status_label.config(text=f"Error starting browser: {e}"))
+            self.app.after(0, lambda e=e: messagebox.showerror("Browser Error", f"Could not start Selenium:\n{e}"))
 
     def start_keepalive_monitor(self):
         def keepalive_check():
@@ -650,12 +881,12 @@ class StockApp(tk.Tk):
 
     def restart_browser(self):
         try:
-            self.status_label.config(text="Browser closed. Restarting...")
+            self.app.status_label.config(text="Browser closed. Restarting...")
             self.driver = self.start_driver()
-            self.status_label.config(text="Browser restarted.")
+            self.app.status_label.config(text="Browser restarted.")
             self.start_keepalive_monitor()
         except Exception as e:
-            self.status_label.config(text=f"Error restarting: {e}")
+            self.app.status_label.config(text=f"Error restarting: {e}")
 
     def start_driver(self):
         service = Service(executable_path=str(CHROME_DRIVER_PATH))
@@ -697,83 +928,416 @@ class StockApp(tk.Tk):
                 raise Exception("Browser not running.")
             _ = self.driver.title
         except Exception:
-            self.status_label.config(text="Browser lost. Restarting...")
+            self.app.status_label.config(text="Browser lost. Restarting...")
             self.restart_browser()
 
-    def _launch_selenium_order(self, symbol, amount, action_text, tracker_frame=None):
+    def place_order(self, symbol, amount, action_text):
+        self.ensure_browser_alive()
+
+        self.app.status_label.config(text=f"Running trade autofill ({action_text.capitalize()})...")
+
+        driver = self.driver
+        wait = WebDriverWait(driver, 20)
+        driver.execute_script("window.open('https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry', '_blank');")
+        driver.switch_to.window(driver.window_handles[-1])
+        wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
+        time.sleep(2)
+        symbol_input = wait.until(EC.visibility_of_element_located((By.ID, "eq-ticket-dest-symbol")))
+        symbol_input.clear()
+        symbol_input.send_keys(symbol)
+        symbol_input.send_keys(Keys.TAB)
+
+        action_button = wait.until(EC.element_to_be_clickable((
+            By.XPATH, f"//s-assigned-wrapper[normalize-space()='{action_text.capitalize()}']"
+        )))
+        driver.execute_script("arguments[0].scrollIntoView(true);", action_button)
+        time.sleep(0.2)
+        action_button.click()
+
+        if action_text.lower() == "buy":
+            type_label = "Dollars"
+        else:
+            type_label = "Shares"
+        type_option = wait.until(EC.element_to_be_clickable((
+            By.XPATH, f"//s-assigned-wrapper[normalize-space()='{type_label}']"
+        )))
+        driver.execute_script("arguments[0].scrollIntoView(true);", type_option)
+        type_option.click()
+
+        quantity_input = wait.until(EC.visibility_of_element_located((By.ID, "eqt-shared-quantity")))
+        quantity_input.clear()
+        quantity_input.send_keys(amount)
+        market_option = wait.until(EC.element_to_be_clickable((
+            By.XPATH, "//s-assigned-wrapper[normalize-space()='Market']"
+        )))
+        driver.execute_script("arguments[0].scrollIntoView(true);", market_option)
+        market_option.click()
+
+        cash_option = wait.until(EC.element_to_be_clickable((
+            By.XPATH, "//s-assigned-wrapper[normalize-space()='Cash']"
+        )))
+        driver.execute_script("arguments[0].scrollIntoView(true);", cash_option)
+        cash_option.click()
+
+        self.app.log_order(symbol, amount, action_text, self.order_tag)
+        self.app.status_label.config(text=f"Done autofill. Waiting for browser close...")
+
+        messagebox.showinfo("Continue", "Close this trading tab when you are finished.\nThen click OK to confirm.")
+        driver.close()
+        driver.switch_to.window(driver.window_handles[0])
+
+        # The order is completed by hand in the browser, so there is no fill to report
+        return None
+
+    def check(self):
         try:
             self.ensure_browser_alive()
 
-            self.status_label.config(text=f"Running trade autofill ({action_text.capitalize()})...")
-
+            self.app.status_label.config(text="Checking Fidelity site elements...")
             driver = self.driver
             wait = WebDriverWait(driver, 20)
             driver.execute_script("window.open('https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry', '_blank');")
             driver.switch_to.window(driver.window_handles[-1])
             wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
-            time.sleep(2)
-            symbol_input = wait.until(EC.visibility_of_element_located((By.ID, "eq-ticket-dest-symbol")))
-            symbol_input.clear()
-            symbol_input.send_keys(symbol)
-            symbol_input.send_keys(Keys.TAB)
-
-            xpath_query = f"//s-assigned-wrapper[normalize-space()='{action_text.capitalize()}']"
-            buttons = driver.find_elements(By.XPATH, xpath_query)
-
-            action_button = wait.until(EC.element_to_be_clickable((
-                By.XPATH, f"//s-assigned-wrapper[normalize-space()='{action_text.capitalize()}']"
-            )))
-            driver.execute_script("arguments[0].scrollIntoView(true);", action_button)
-            time.sleep(0.2)
-            action_button.click()
-
-            if action_text.lower() == "buy":
-                type_label = "Dollars"
+            time.sleep(3)
+            checks = [("eq-ticket-dest-symbol", "Stock symbol input"), ("eqt-shared-quantity", "Quantity input")]
+            missing = []
+            for element_id, description in checks:
+                try:
+                    wait.until(EC.presence_of_element_located((By.ID, element_id)))
+                except:
+                    missing.append(f"{description} (ID: {element_id})")
+            if missing:
+                missing_str = "\n".join(missing)
+                messagebox.showerror("Fidelity Site Check Failed", f"The following expected elements were not found:\n\n{missing_str}")
+                self.app.status_label.config(text="Fidelity site check failed.")
+            else:
+                messagebox.showinfo("Fidelity Site Check", "✔ Elements found. Page structure OK.")
+                self.app.status_label.config(text="Fidelity site check passed.")
+        except Exception as e:
+            self.app.status_label.config(text=f"Error: {e}")
+            messagebox.showerror("Fidelity Site Check Error", f"Could not complete site check:\n{e}")
+
+    def stop(self):
+        if self.driver:
+            try:
+                self.driver.quit()
+            except Exception as e:
+                print(f"Driver quit failed: {e}")
+            try:
+                self.driver.service.stop()
+            except Exception as e:
+                print(f"Service stop failed: {e}")
+            try:
+                if self.driver.service.process:
+                    self.driver.service.process.kill()
+            except Exception as e:
+                print(f"Direct kill failed: {e}")
+
+
+def live_price(symbol):
+    df = yahoo.download(symbol, period="1d", interval="1m", max_age=5)
+    if df.empty:
+        return None
+    return df["Close"].iloc[-1].item()
+
+
+class ReplayPriceFeed:
+    def __init__(self, start, speed=1.0):
+        self.start_ts = pd.Timestamp(start, tz="US/Eastern").tz_convert("UTC").value
+        self.speed = speed
+        self.started = time.perf_counter()
+        self.bars = {}
+        self.lock = threading.Lock()
+
+    def now_ns(self):
+        return self.start_ts + int((time.perf_counter() - self.started) * self.speed * 1e9)
+
+    def __call__(self, symbol):
+        with self.lock:
+            if symbol not in self.bars:
+                df = load_bars(symbol)
+                if df is None or df.empty:
+                    self.bars[symbol] = None
+                else:
+                    self.bars[symbol] = (df.index.as_unit("ns").asi8, df["Close"].to_numpy(dtype=np.float64))
+            bars = self.bars[symbol]
+        if bars is None:
+            return None
+        timestamps, closes = bars
+        i = np.searchsorted(timestamps, self.now_ns(), side="right") - 1
+        if i < 0:
+            return None
+        return float(closes[i])
+
+
+class PaperBroker(ExecutionBackend):
+    name = "Paper"
+    check_label = "Show Paper Positions"
+    order_tag = "Market, Paper"
+
+    def __init__(self, app, price_source=live_price, latency_ms=250, jitter_ms=100, slippage_bps=5):
+        super().__init__(app)
+        self.price_source = price_source
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.slippage_bps = slippage_bps
+        self.positions = {}
+        self.lock = threading.Lock()
+        self.rng = np.random.default_rng()
+
+    def start(self):
+        self.app.after(0, lambda: self.app.status_label.config(text="Paper trading backend ready."))
+
+    def place_order(self, symbol, amount, action_text):
+        buy = action_text.lower() == "buy"
+        time.sleep(max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms)) / 1000)
+
+        price = self.price_source(symbol)
+        if price is None:
+            raise ValueError(f"No price available to fill {symbol}.")
+        slippage = self.slippage_bps / 10000
+        fill_price = price * (1 + slippage) if buy else price * (1 - slippage)
+
+        # Buys are entered in dollars and sells in shares, like the Fidelity ticket
+        with self.lock:
+            shares, cost = self.positions.get(symbol, (0.0, 0.0))
+            if buy:
+                filled = float(amount) / fill_price
+                shares, cost = shares + filled, cost + filled * fill_price
             else:
-                type_label = "Shares"
-            type_option = wait.until(EC.element_to_be_clickable((
-                By.XPATH, f"//s-assigned-wrapper[normalize-space()='{type_label}']"
-            )))
-            driver.execute_script("arguments[0].scrollIntoView(true);", type_option)
-            type_option.click()
-
-            quantity_input = wait.until(EC.visibility_of_element_located((By.ID, "eqt-shared-quantity")))
-            quantity_input.clear()
-            quantity_input.send_keys(amount)
-            market_option = wait.until(EC.element_to_be_clickable((
-                By.XPATH, "//s-assigned-wrapper[normalize-space()='Market']"
-            )))
-            driver.execute_script("arguments[0].scrollIntoView(true);", market_option)
-            market_option.click()
-
-            cash_option = wait.until(EC.element_to_be_clickable((
-                By.XPATH, "//s-assigned-wrapper[normalize-space()='Cash']"
-            )))
-            driver.execute_script("arguments[0].scrollIntoView(true);", cash_option)
-            cash_option.click()
-
-            line = f"[{datetime.now().strftime('%H:%M:%S')}] Executed {action_text.capitalize()}: {symbol}, Qty: {amount}, Market, Cash\n"
-            self.log_file.write(line)
+                filled = min(float(amount), shares)
+                if filled <= 0:
+                    raise ValueError(f"No paper position in {symbol} to sell.")
+                cost -= cost * filled / shares
+                shares -= filled
+            if shares > 1e-9:
+                self.positions[symbol] = (shares, cost)
+            else:
+                self.positions.pop(symbol, None)
+
+        self.app.log_order(symbol, amount, action_text, self.order_tag)
+        return {"symbol": symbol, "action": action_text, "shares": filled, "price": fill_price}
+
+    def check(self):
+        with self.lock:
+            positions = dict(self.positions)
+        if not positions:
+            messagebox.showinfo("Paper Positions", "No open paper positions.")
+            return
+        lines = [f"{symbol}: {shares:.4f} sh, avg ${cost / shares:.2f}" for symbol, (shares, cost) in sorted(positions.items())]
+        messagebox.showinfo("Paper Positions", "\n".join(lines))
+
+    def session_state(self):
+        with self.lock:
+            return {symbol: [shares, cost] for symbol, (shares, cost) in self.positions.items()}
+
+    def restore(self, state):
+        with self.lock:
+            self.positions = {symbol: (float(shares), float(cost)) for symbol, (shares, cost) in state.items()}
+
+
+def order_log_line(symbol, amount, action_text, order_tag):
+    return f"[{datetime.now().strftime('%H:%M:%S')}] Executed {action_text.capitalize()}: {symbol}, Qty: {amount}, {order_tag}\n"
+
+
+def fill_log_line(fill, latency_ms):
+    return (f"[{datetime.now().strftime('%H:%M:%S')}] Fill {fill['action'].capitalize()} {fill['symbol']}: "
+            f"{fill['shares']:.4f} sh @ ${fill['price']:.2f}, click-to-fill {latency_ms:.0f} ms\n")
+
+
+class PaperLoadTestSession:
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.log_lock = threading.Lock()
+
+    def log_order(self, symbol, amount, action_text, order_tag):
+        with self.log_lock:
+            self.log_file.write(order_log_line(symbol, amount, action_text, order_tag))
+            self.log_file.flush()
+
+
+def run_paper_load_test(symbols, orders, workers=8, amount="50", **broker_kwargs):
+    log_path = log_dir / datetime.now().strftime("%d%b%y_%H.%M.%S_paper_load.txt")
+    with open(log_path, "a") as log_file:
+        session = PaperLoadTestSession(log_file)
+        broker = PaperBroker(session, **broker_kwargs)
+
+        def one_order(i):
+            symbol = symbols[i % len(symbols)]
+            clicked_at = time.perf_counter()
+            try:
+                broker.place_order(symbol, amount, "buy")
+            except Exception as e:
+                print(f"Paper order {i} for {symbol} failed: {e}")
+                return None
+            return (time.perf_counter() - clicked_at) * 1000
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            latencies = [ms for ms in pool.map(one_order, range(orders)) if ms is not None]
+        elapsed = time.perf_counter() - started
+
+    if not latencies:
+        print("⚠ No paper orders filled.")
+        return
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    print(f"✅ {len(latencies)}/{orders} paper orders filled in {elapsed:.1f}s ({len(latencies) / elapsed:.1f} orders/s)")
+    print(f"Click-to-fill latency: p50 {p50:.0f} ms, p95 {p95:.0f} ms, p99 {p99:.0f} ms")
+    print(f"Trade log written to {log_path}")
+
+
+class StockApp(tk.Tk):
+    def __init__(self, backend_factory=FidelitySeleniumBackend):
+        super().__init__()
+        self.title("8-Tracker Stock Viewer with Normalized Index + Staggered Updates + Trade Autofill")
+        self.geometry("1700x950")
+
+        snapshot = load_session_snapshot()
+        saved_states = snapshot["trackers"] if snapshot else []
+        tracked_tickers = [state["symbol"] for state in saved_states] or load_latest_tracked_tickers()
+
+        now = datetime.now()
+        filename = now.strftime("%d%b%y_%H.%M.%S.txt")
+        log_path = log_dir / filename
+        self.log_file = open(log_path, "a")
+        self.log_file.write(f"Session started at {now.strftime('%Y-%m-%d %H:%M:%S')}\n")
+        self.log_file.flush()
+        self.log_lock = threading.Lock()
+
+        self.backend = backend_factory(self)
+        # Only hand saved positions back to the same kind of backend that made them
+        saved_backend = snapshot.get("backend") if snapshot else None
+        if saved_backend and saved_backend["name"] == self.backend.name and saved_backend["state"] is not None:
+            self.backend.restore(saved_backend["state"])
+        self.portfolio = Portfolio()
+        self.relative_strength = RelativeStrength()
+        benchmarks = snapshot.get("benchmarks", DEFAULT_BENCHMARKS) if snapshot else DEFAULT_BENCHMARKS
+        self.rs_benchmark = snapshot.get("rs_benchmark", benchmarks[-1]) if snapshot else benchmarks[-1]
+
+        self.default_font = ("Helvetica", 15)
+
+        self.top_frame = ttk.Frame(self)
+        self.top_frame.pack(fill=tk.BOTH, expand=True)
+
+        ROWS = 2
+        COLS = 4
+        tracker_id = 1
+        symbol_index = 0
+        for r in range(ROWS):
+            self.top_frame.rowconfigure(r, weight=1)
+            for c in range(COLS):
+                self.top_frame.columnconfigure(c, weight=1)
+                delay_ms = ((r * COLS + c) % 8) * 1000
+                if r == 0 and c == 0:
+                    tracker = MultiIndexTrackerFrame(self.top_frame, self, delay_ms, benchmarks)
+                    self.index_tracker = tracker
+                else:
+                    initial_symbol = tracked_tickers[symbol_index] if symbol_index < len(tracked_tickers) else ""
+                    saved_state = saved_states[symbol_index] if symbol_index < len(saved_states) else None
+                    tracker = StockTrackerFrame(self.top_frame, tracker_id, self, delay_ms, initial_symbol, saved_state)
+                    tracker_id += 1
+                    symbol_index += 1
+                tracker.grid(row=r, column=c, padx=4, pady=4, sticky="nsew")
+
+        self.bottom_frame = ttk.Frame(self)
+        self.bottom_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=10)
+
+        self.check_button = ttk.Button(self.bottom_frame, text=self.backend.check_label, command=self.check_backend)
+        self.check_button.pack(side=tk.LEFT, padx=5)
+        self.check_button.config(style="Big.TButton")
+
+        status_text = f"Restored session from {snapshot['saved_at']}." if snapshot else "Ready."
+        self.status_label = ttk.Label(self.bottom_frame, text=status_text, font=self.default_font)
+        self.status_label.pack(side=tk.LEFT, padx=20)
+
+        self.override_button = ttk.Button(self.bottom_frame, text="Override Enable Buttons", command=self.enable_all_trackers)
+        self.override_button.pack(side=tk.RIGHT, padx=5)
+        self.override_button.config(style="Big.TButton")
+
+        self.portfolio_label = ttk.Label(self.bottom_frame, text=self.portfolio.summary_text(), font=self.default_font)
+        self.portfolio_label.pack(side=tk.RIGHT, padx=20)
+
+        threading.Thread(target=self.backend.start, daemon=True).start()
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.after(CHECKPOINT_INTERVAL_MS, self.checkpoint)
+
+    def on_price_update(self, symbol, price):
+        self.portfolio.update_price(symbol, price)
+        self.refresh_portfolio_bar()
+        self.update_relative_strength(symbol)
+
+    def update_relative_strength(self, symbol):
+        benchmark = bar_store.get(self.rs_benchmark)
+        self.relative_strength.update(symbol, bar_store.get(symbol), benchmark)
+        stats = self.relative_strength.stats(symbol)
+        for tracker in self.stock_trackers():
+            if tracker.stock_symbol == symbol:
+                tracker.show_relative_strength(self.rs_benchmark, stats)
+
+    def refresh_relative_strength(self):
+        for symbol in {tracker.stock_symbol for tracker in self.stock_trackers() if tracker.stock_symbol}:
+            self.update_relative_strength(symbol)
+        for tracker in self.stock_trackers():
+            tracker.canvas.draw_idle()
+
+    def set_rs_benchmark(self, symbol):
+        self.rs_benchmark = symbol
+        self.relative_strength.reset()
+        self.refresh_relative_strength()
+
+    def open_position(self, key, symbol, entry_price, dollars):
+        self.portfolio.open(key, symbol, entry_price, dollars=dollars)
+        self.refresh_portfolio_bar()
+
+    def close_position(self, key):
+        self.portfolio.close(key)
+        self.refresh_portfolio_bar()
+
+    def refresh_portfolio_bar(self):
+        # Trackers repaint from the session snapshot before the bottom bar exists
+        if hasattr(self, 'portfolio_label'):
+            self.portfolio_label.config(text=self.portfolio.summary_text())
+
+    def stock_trackers(self):
+        return [child for child in self.top_frame.winfo_children() if isinstance(child, StockTrackerFrame)]
+
+    def checkpoint(self):
+        try:
+            save_session_snapshot(self.stock_trackers(), self.index_tracker)
+        except Exception as e:
+            print(f"Session checkpoint failed: {e}")
+        self.after(CHECKPOINT_INTERVAL_MS, self.checkpoint)
+
+    def log_order(self, symbol, amount, action_text, order_tag):
+        with self.log_lock:
+            self.log_file.write(order_log_line(symbol, amount, action_text, order_tag))
             self.log_file.flush()
-            self.status_label.config(text=f"Done autofill. Waiting for browser close...")
-            
-            messagebox.showinfo("Continue", "Close this trading tab when you are finished.\nThen click OK to confirm.")
-            driver.close() 
-            driver.switch_to.window(driver.window_handles[0])
 
+    def _launch_order(self, symbol, amount, action_text, tracker_frame=None, clicked_at=None):
+        try:
+            fill = self.backend.place_order(symbol, amount, action_text)
+
+            if fill is not None and clicked_at is not None:
+                latency_ms = (time.perf_counter() - clicked_at) * 1000
+                with self.log_lock:
+                    self.log_file.write(fill_log_line(fill, latency_ms))
+                    self.log_file.flush()
+
+            fill_price = fill["price"] if fill else None
             if action_text.lower() =="buy" and tracker_frame:
-                tracker_frame.post_purchase_action()
+                tracker_frame.post_purchase_action(fill_price)
             elif action_text.lower() == "sell" and tracker_frame:
-                tracker_frame.post_sale_action()
+                tracker_frame.post_sale_action(fill_price)
 
             self.status_label.config(text=f"{action_text.capitalize()} completed. Ready.")
 
         except Exception as e:
             self.status_label.config(text=f"Error: {e}")
-            messagebox.showerror("Selenium Error", f"Something went wrong:\n{e}")
+            messagebox.showerror(f"{self.backend.name} Order Error", f"Something went wrong:\n{e}")
 
-    def check_fidelity_elements(self):
-        threading.Thread(target=self._check_elements_thread, daemon=True).start()
+    def check_backend(self):
+        threading.Thread(target=self.backend.check, daemon=True).start()
 
     def disable_all_trackers(self):
         for child in self.top_frame.winfo_children():
@@ -792,38 +1356,9 @@ class StockApp(tk.Tk):
                     if hasattr(h, 'get_linestyle') and (h.get_linestyle() == '-'):
                         h.remove()
                 child.hlines.clear()
-                child.highlight_price = None
+                child.close_position()
                 child.canvas.draw()
 
-    def _check_elements_thread(self):
-        try:
-            self.ensure_browser_alive()
-
-            self.status_label.config(text="Checking Fidelity site elements...")
-            driver = self.driver
-            wait = WebDriverWait(driver, 20)
-            driver.execute_script("window.open('https://digital.fidelity.com/ftgw/digital/trade-equity/index/orderEntry', '_blank');")
-            driver.switch_to.window(driver.window_handles[-1])
-            wait.until(lambda d: d.execute_script('return document.readyState') == 'complete')
-            time.sleep(3)
-            checks = [("eq-ticket-dest-symbol", "Stock symbol input"), ("eqt-shared-quantity", "Quantity input")]
-            missing = []
-            for element_id, description in checks:
-                try:
-                    wait.until(EC.presence_of_element_located((By.ID, element_id)))
-                except:
-                    missing.append(f"{description} (ID: {element_id})")
-            if missing:
-                missing_str = "\n".join(missing)
-                messagebox.showerror("Fidelity Site Check Failed", f"The following expected elements were not found:\n\n{missing_str}")
-                self.status_label.config(text="Fidelity site check failed.")
-            else:
-                messagebox.showinfo("Fidelity Site Check", "✔ Elements found. Page structure OK.")
-                self.status_label.config(text="Fidelity site check passed.")
-        except Exception as e:
-            self.status_label.config(text=f"Error: {e}")
-            messagebox.showerror("Fidelity Site Check Error", f"Could not complete site check:\n{e}")
-
     def on_close(self):
         try:
             tickers = []
@@ -835,20 +1370,12 @@ class StockApp(tk.Tk):
                 self.log_file.write("\nTRACKED_TICKERS:" + ",".join(tickers) + "\n")
                 self.log_file.flush()
 
-            if hasattr(self, 'driver') and self.driver:
-                try:
-                    self.driver.quit()
-                except Exception as e:
-                    print(f"Driver quit failed: {e}")
-                try:
-                    self.driver.service.stop()
-                except Exception as e:
-                    print(f"Service stop failed: {e}")
-                try:
-                    if self.driver.service.process:
-                        self.driver.service.process.kill()
-                except Exception as e:
-                    print(f"Direct kill failed: {e}")
+            try:
+                save_session_snapshot(self.stock_trackers(), self.index_tracker)
+            except Exception as e:
+                print(f"Session snapshot failed: {e}")
+
+            self.backend.stop()
         except Exception as e:
             print(f"Unexpected error on close: {e}")
         finally:
@@ -860,5 +1387,24 @@ class StockApp(tk.Tk):
             os._exit(0)
 
 if __name__ == "__main__":
-    app = StockApp()
-    app.mainloop()
+    parser = argparse.ArgumentParser(description="Stock tracker with Fidelity trade autofill.")
+    parser.add_argument("--paper", action="store_true", help="Fill orders with the local paper broker instead of Fidelity")
+    parser.add_argument("--replay", metavar="DATETIME", help="Paper fills from stored bars starting at this Eastern time, e.g. '2025-06-02 09:30'")
+    parser.add_argument("--replay-speed", type=float, default=1.0, help="Replay clock multiplier")
+    parser.add_argument("--latency-ms", type=float, default=250, help="Simulated paper fill latency")
+    parser.add_argument("--jitter-ms", type=float, default=100, help="Random +/- spread on the fill latency")
+    parser.add_argument("--slippage-bps", type=float, default=5, help="Simulated paper slippage in basis points")
+    parser.add_argument("--load-test", type=int, metavar="ORDERS", help="Fire this many paper orders without the UI and report fill latency")
+    parser.add_argument("--symbols", nargs="+", default=["AAPL"], help="Symbols used by --load-test")
+    args = parser.parse_args()
+
+    price_source = ReplayPriceFeed(args.replay, args.replay_speed) if args.replay else live_price
+    broker_kwargs = dict(price_source=price_source, latency_ms=args.latency_ms,
+                         jitter_ms=args.jitter_ms, slippage_bps=args.slippage_bps)
+
+    if args.load_test:
+        run_paper_load_test([s.upper() for s in args.symbols], args.load_test, **broker_kwargs)
+    else:
+        backend_factory = (lambda app: PaperBroker(app, **broker_kwargs)) if args.paper else FidelitySeleniumBackend
+        app = StockApp(backend_factory)
+        app.mainloop()